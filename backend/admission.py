@@ -0,0 +1,117 @@
+import time
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, Dict, Hashable
+
+from .metrics import (
+    ADMISSION_IN_FLIGHT, ADMISSION_QUEUE_DEPTH, ADMISSION_SHED, ADMISSION_WAIT_SECONDS, COALESCED_REQUESTS
+)
+
+logger = logging.getLogger(__name__)
+
+
+class Overloaded(Exception):
+    """Raised when a request is shed; carries the HTTP status to answer with"""
+
+    def __init__(self, status_code: int, detail: str, retry_after: float):
+        super().__init__(detail)
+        self.status_code = status_code
+        self.detail = detail
+        self.retry_after = retry_after
+
+
+class AdmissionController:
+    """Bounded concurrency with a bounded wait queue.
+
+    At most ``max_concurrent`` requests run at once and at most
+    ``max_queue`` wait for a slot. A request arriving to a full queue is
+    shed immediately with 429; one that waits longer than ``queue_timeout``
+    seconds is shed with 503. Both carry a Retry-After hint.
+    """
+
+    def __init__(self, name: str, max_concurrent: int, max_queue: int, queue_timeout: float):
+        self.name = name
+        self.max_concurrent = max_concurrent
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self._semaphore = asyncio.Semaphore(max_concurrent)
+        self.in_flight = 0
+        self.queued = 0
+        self.shed = 0
+
+    async def acquire(self) -> None:
+        """Wait for a slot or raise Overloaded"""
+        if not self._semaphore.locked():
+            await self._semaphore.acquire()
+            self._admitted(0.0)
+            return
+
+        if self.queued >= self.max_queue:
+            self._shed("queue_full")
+            raise Overloaded(429, f"Too many requests: {self.queued} already queued", self.queue_timeout)
+
+        self.queued += 1
+        ADMISSION_QUEUE_DEPTH.labels(pool=self.name).inc()
+        started = time.perf_counter()
+        try:
+            await asyncio.wait_for(self._semaphore.acquire(), self.queue_timeout)
+        except asyncio.TimeoutError:
+            self._shed("queue_timeout")
+            raise Overloaded(503, f"Server busy: no capacity within {self.queue_timeout:.0f}s", self.queue_timeout)
+        finally:
+            self.queued -= 1
+            ADMISSION_QUEUE_DEPTH.labels(pool=self.name).dec()
+        self._admitted(time.perf_counter() - started)
+
+    def release(self) -> None:
+        self.in_flight -= 1
+        ADMISSION_IN_FLIGHT.labels(pool=self.name).dec()
+        self._semaphore.release()
+
+    def _admitted(self, waited: float) -> None:
+        self.in_flight += 1
+        ADMISSION_IN_FLIGHT.labels(pool=self.name).inc()
+        ADMISSION_WAIT_SECONDS.labels(pool=self.name).observe(waited)
+
+    def _shed(self, reason: str) -> None:
+        self.shed += 1
+        ADMISSION_SHED.labels(pool=self.name, reason=reason).inc()
+        logger.warning(f"Shedding {self.name} request ({reason}): {self.in_flight} running, {self.queued} queued")
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "max_concurrent": self.max_concurrent,
+            "max_queue": self.max_queue,
+            "queue_timeout": self.queue_timeout,
+            "in_flight": self.in_flight,
+            "queued": self.queued,
+            "shed": self.shed,
+        }
+
+
+class Coalescer:
+    """Shares one computation between identical concurrent requests.
+
+    The first caller for a key starts the computation as its own task; later
+    callers with the same key await that task instead of starting another.
+    The key is forgotten once the computation finishes, so results are not
+    cached beyond the in-flight window. A caller that is cancelled does not
+    cancel the shared task.
+    """
+
+    def __init__(self, kind: str):
+        self.kind = kind
+        self._in_flight: Dict[Hashable, asyncio.Future] = {}
+
+    async def run(self, key: Hashable, factory: Callable[[], Awaitable[Any]]) -> Any:
+        task = self._in_flight.get(key)
+        if task is not None:
+            COALESCED_REQUESTS.labels(kind=self.kind).inc()
+        else:
+            task = asyncio.ensure_future(factory())
+            self._in_flight[key] = task
+            task.add_done_callback(lambda _: self._in_flight.pop(key, None))
+        return await asyncio.shield(task)
+
+    def __len__(self) -> int:
+        return len(self._in_flight)
@@ -0,0 +1,160 @@
+import re
+import logging
+from typing import Dict, List, Optional, Set, Tuple
+
+from .models import SearchResult
+
+logger = logging.getLogger(__name__)
+
+_WORD_RE = re.compile(r"\w+")
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count (about four characters per token for English prose)"""
+    return len(text) // 4 + 1
+
+
+def _shingles(text: str, size: int = 3) -> Set[Tuple[str, ...]]:
+    words = _WORD_RE.findall(text.lower())
+    if len(words) < size:
+        return {tuple(words)}
+    return {tuple(words[i:i + size]) for i in range(len(words) - size + 1)}
+
+
+def _jaccard(a: Set, b: Set) -> float:
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+
+def merge_overlapping(first: str, second: str, max_overlap: int = 400, min_overlap: int = 20) -> Optional[str]:
+    """Join two consecutive chunks, dropping the text the splitter repeated at
+    the boundary; returns None if no overlap is found"""
+    limit = min(max_overlap, len(first), len(second))
+    for size in range(limit, min_overlap - 1, -1):
+        if first.endswith(second[:size]):
+            return first + second[size:]
+    return None
+
+
+class _Candidate:
+    __slots__ = ("drug", "source", "chunk_index", "content", "tokens", "shingles")
+
+    def __init__(self, drug: str, result: SearchResult):
+        self.drug = drug
+        self.source = result.source
+        self.chunk_index = result.metadata.get("chunk_index")
+        self.content = result.content
+        self.tokens = estimate_tokens(result.content)
+        self.shingles = _shingles(result.content)
+
+
+def _run_entry(run: List[_Candidate], order: Dict[int, int], text: str) -> Tuple[int, str, str]:
+    """(selection position, drug, text) of a merged run, attributed to its earliest pick"""
+    first = min(run, key=lambda candidate: order[id(candidate)])
+    return order[id(first)], first.drug, text
+
+
+def pack_context(results_by_drug: Dict[str, List[SearchResult]], token_budget: int,
+                 duplicate_threshold: float = 0.85) -> List[str]:
+    """Select and merge search results into context chunks for the summary prompt.
+
+    Results are taken per drug in rank order. Chunks retrieved for several
+    drugs, or whose text nearly duplicates an already selected chunk, are
+    dropped. Each drug first gets an equal share of ``token_budget``; budget
+    left unused by drugs with little context is then filled round-robin.
+    Selected chunks that are adjacent in the same document are merged with
+    their shared overlap removed. Chunks come back grouped by drug, in the
+    order drugs were given.
+    """
+    queues: Dict[str, List[_Candidate]] = {
+        drug: [_Candidate(drug, result) for result in results]
+        for drug, results in results_by_drug.items()
+        if results
+    }
+    if not queues or token_budget <= 0:
+        return []
+
+    selected: List[_Candidate] = []
+    seen_keys: Set[Tuple[str, object]] = set()
+    used = {drug: 0 for drug in queues}
+    remaining = token_budget
+
+    def is_duplicate(candidate: _Candidate) -> bool:
+        if candidate.chunk_index is not None and (candidate.source, candidate.chunk_index) in seen_keys:
+            return True
+        return any(
+            _jaccard(candidate.shingles, chosen.shingles) >= duplicate_threshold
+            for chosen in selected
+        )
+
+    def fill(share: Optional[int]) -> None:
+        nonlocal remaining
+        progress = True
+        while progress:
+            progress = False
+            for drug, queue in queues.items():
+                while queue:
+                    candidate = queue[0]
+                    if is_duplicate(candidate):
+                        queue.pop(0)
+                        continue
+                    if share is None and candidate.tokens > remaining:
+                        # Last pass: a smaller, lower-ranked chunk may still fit
+                        queue.pop(0)
+                        continue
+                    # A drug's best chunk is admitted even if it exceeds the share
+                    fits_share = share is None or not used[drug] or used[drug] + candidate.tokens <= share
+                    if candidate.tokens > remaining or not fits_share:
+                        break
+                    queue.pop(0)
+                    selected.append(candidate)
+                    seen_keys.add((candidate.source, candidate.chunk_index))
+                    used[drug] += candidate.tokens
+                    remaining -= candidate.tokens
+                    progress = True
+                    break
+
+    # Fair share first, then spend whatever the others left over
+    fill(token_budget // len(queues))
+    fill(None)
+
+    # Merge runs of consecutive chunk_index within a document
+    order = {id(candidate): position for position, candidate in enumerate(selected)}
+    by_source: Dict[str, List[_Candidate]] = {}
+    for candidate in selected:
+        by_source.setdefault(candidate.source, []).append(candidate)
+
+    merged: List[Tuple[int, str, str]] = []
+    for candidates in by_source.values():
+        indexed = sorted(
+            (c for c in candidates if c.chunk_index is not None), key=lambda c: c.chunk_index
+        )
+        unindexed = [c for c in candidates if c.chunk_index is None]
+        run: List[_Candidate] = []
+        text = ""
+        for candidate in indexed:
+            joined = None
+            if run and candidate.chunk_index == run[-1].chunk_index + 1:
+                joined = merge_overlapping(text, candidate.content) or f"{text}\n{candidate.content}"
+            if joined is not None:
+                run.append(candidate)
+                text = joined
+                continue
+            if run:
+                merged.append(_run_entry(run, order, text))
+            run = [candidate]
+            text = candidate.content
+        if run:
+            merged.append(_run_entry(run, order, text))
+        merged.extend((order[id(c)], c.drug, c.content) for c in unindexed)
+
+    drug_rank = {drug: rank for rank, drug in enumerate(queues)}
+    merged.sort(key=lambda item: (drug_rank[item[1]], item[0]))
+    chunks = [text for _, _, text in merged]
+
+    logger.info(
+        f"Packed {len(selected)} of {sum(len(r) for r in results_by_drug.values())} results "
+        f"into {len(chunks)} context chunks (~{token_budget - remaining}/{token_budget} tokens)"
+    )
+    return chunks
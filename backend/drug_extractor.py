@@ -0,0 +1,259 @@
+import re
+import logging
+import threading
+from collections import deque
+from typing import Dict, Iterable, List, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Generic names always in the lexicon; more are mined from the ingested guidelines
+SEED_GENERICS = [
+    "amikacin", "amoxicillin", "amoxicillin-clavulanate", "ampicillin", "ampicillin-sulbactam",
+    "azithromycin", "aztreonam", "benzathine benzylpenicillin", "benzylpenicillin",
+    "cefaclor", "cefalexin", "cefazolin", "cefepime", "cefixime", "cefotaxime", "cefoxitin",
+    "ceftaroline", "ceftazidime", "ceftazidime-avibactam", "ceftolozane-tazobactam",
+    "ceftriaxone", "cefuroxime", "chloramphenicol", "ciprofloxacin",
+    "clarithromycin", "clindamycin", "colistin", "daptomycin", "dicloxacillin", "doxycycline",
+    "ertapenem", "erythromycin", "flucloxacillin", "fluconazole", "fosfomycin", "fusidic acid",
+    "gentamicin", "imipenem", "levofloxacin", "linezolid", "meropenem", "metronidazole",
+    "minocycline", "moxifloxacin", "nitrofurantoin", "norfloxacin", "oseltamivir",
+    "penicillin", "phenoxymethylpenicillin", "piperacillin", "piperacillin-tazobactam",
+    "rifampicin", "roxithromycin", "sulfamethoxazole", "teicoplanin",
+    "tetracycline", "ticarcillin-clavulanate", "tigecycline", "tinidazole", "tobramycin",
+    "trimethoprim", "trimethoprim-sulfamethoxazole", "valaciclovir", "aciclovir",
+    "vancomycin",
+]
+
+# Brand and alternative names mapped to the generic that is reported; US
+# spellings map to the INN so one drug is searched and summarised once
+SEED_ALIASES = {
+    "cephalexin": "cefalexin",
+    "rifampin": "rifampicin",
+    "acyclovir": "aciclovir",
+    "valacyclovir": "valaciclovir",
+    "augmentin": "amoxicillin-clavulanate",
+    "co-amoxiclav": "amoxicillin-clavulanate",
+    "amoxicillin clavulanate": "amoxicillin-clavulanate",
+    "amoxicillin/clavulanate": "amoxicillin-clavulanate",
+    "amoxil": "amoxicillin",
+    "bactrim": "trimethoprim-sulfamethoxazole",
+    "septra": "trimethoprim-sulfamethoxazole",
+    "co-trimoxazole": "trimethoprim-sulfamethoxazole",
+    "cotrimoxazole": "trimethoprim-sulfamethoxazole",
+    "trimethoprim/sulfamethoxazole": "trimethoprim-sulfamethoxazole",
+    "tmp-smx": "trimethoprim-sulfamethoxazole",
+    "keflex": "cefalexin",
+    "zithromax": "azithromycin",
+    "cipro": "ciprofloxacin",
+    "ciproxin": "ciprofloxacin",
+    "flagyl": "metronidazole",
+    "tazocin": "piperacillin-tazobactam",
+    "zosyn": "piperacillin-tazobactam",
+    "piperacillin/tazobactam": "piperacillin-tazobactam",
+    "pip-tazo": "piperacillin-tazobactam",
+    "rocephin": "ceftriaxone",
+    "vancocin": "vancomycin",
+    "zyvox": "linezolid",
+    "cleocin": "clindamycin",
+    "dalacin": "clindamycin",
+    "doryx": "doxycycline",
+    "vibramycin": "doxycycline",
+    "macrobid": "nitrofurantoin",
+    "macrodantin": "nitrofurantoin",
+    "levaquin": "levofloxacin",
+    "avelox": "moxifloxacin",
+    "merrem": "meropenem",
+    "invanz": "ertapenem",
+    "tamiflu": "oseltamivir",
+    "valtrex": "valaciclovir",
+    "zovirax": "aciclovir",
+    "diflucan": "fluconazole",
+    "penicillin v": "phenoxymethylpenicillin",
+    "penicillin g": "benzylpenicillin",
+    "bicillin": "benzathine benzylpenicillin",
+}
+
+# Word endings that identify antimicrobial generic names in guideline text
+DRUG_SUFFIXES = (
+    "cillin", "mycin", "micin", "floxacin", "oxacin", "cycline", "penem", "bactam",
+    "nidazole", "conazole", "fungin", "planin", "zolid", "ciclovir", "cyclovir",
+    "sporin", "xime", "triaxone", "taxime", "tazidime", "fazolin", "alexin", "uroxime",
+)
+
+_WORD_RE = re.compile(r"[a-z][a-z\-/]*[a-z]")
+
+
+def _normalize(text: str) -> str:
+    return text.lower()
+
+
+def _is_boundary(text: str, index: int) -> bool:
+    return index < 0 or index >= len(text) or not text[index].isalnum()
+
+
+def _within_distance(a: str, b: str, max_distance: int) -> bool:
+    """Levenshtein distance check with early exit once the bound is exceeded"""
+    if abs(len(a) - len(b)) > max_distance:
+        return False
+    previous = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        current = [i]
+        for j, cb in enumerate(b, 1):
+            current.append(min(
+                previous[j] + 1,
+                current[j - 1] + 1,
+                previous[j - 1] + (ca != cb)
+            ))
+        if min(current) > max_distance:
+            return False
+        previous = current
+    return previous[-1] <= max_distance
+
+
+class AhoCorasick:
+    """Aho-Corasick automaton over lowercase patterns"""
+
+    def __init__(self, patterns: Iterable[str]):
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._output: List[List[str]] = [[]]
+
+        for pattern in patterns:
+            self._insert(pattern)
+        self._build_failure_links()
+
+    def _insert(self, pattern: str) -> None:
+        node = 0
+        for char in pattern:
+            next_node = self._goto[node].get(char)
+            if next_node is None:
+                next_node = len(self._goto)
+                self._goto[node][char] = next_node
+                self._goto.append({})
+                self._fail.append(0)
+                self._output.append([])
+            node = next_node
+        self._output[node].append(pattern)
+
+    def _build_failure_links(self) -> None:
+        queue = deque(self._goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for char, child in self._goto[node].items():
+                queue.append(child)
+                fallback = self._fail[node]
+                while fallback and char not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                self._fail[child] = self._goto[fallback].get(char, 0)
+                self._output[child] = self._output[child] + self._output[self._fail[child]]
+
+    def find_all(self, text: str) -> List[Tuple[int, int, str]]:
+        """All (start, end, pattern) occurrences in text"""
+        matches = []
+        node = 0
+        for index, char in enumerate(text):
+            while node and char not in self._goto[node]:
+                node = self._fail[node]
+            node = self._goto[node].get(char, 0)
+            for pattern in self._output[node]:
+                matches.append((index - len(pattern) + 1, index + 1, pattern))
+        return matches
+
+
+class DrugExtractor:
+    """Local dictionary-based drug-name extractor.
+
+    Exact matches come from an Aho-Corasick automaton over the lexicon;
+    remaining words are fuzzy-matched against single-word lexicon entries
+    to catch misspellings.
+    """
+
+    def __init__(self, fuzzy: bool = True):
+        self.fuzzy = fuzzy
+        self._lock = threading.Lock()
+        self._mined_terms: Set[str] = set()
+        self._build(set())
+
+    def _build(self, mined_terms: Set[str]) -> None:
+        canonical: Dict[str, str] = {name: name for name in SEED_GENERICS}
+        for term in mined_terms:
+            canonical.setdefault(term, term)
+        canonical.update(SEED_ALIASES)
+
+        automaton = AhoCorasick(canonical.keys())
+
+        # Fuzzy candidates indexed by first letter; multi-word terms are matched exactly only
+        fuzzy_index: Dict[str, List[str]] = {}
+        for term in canonical:
+            if " " not in term and len(term) >= 6:
+                fuzzy_index.setdefault(term[0], []).append(term)
+
+        with self._lock:
+            self._canonical = canonical
+            self._automaton = automaton
+            self._fuzzy_index = fuzzy_index
+            self._mined_terms = mined_terms
+
+    @property
+    def lexicon_size(self) -> int:
+        return len(self._canonical)
+
+    def build_from_corpus(self, documents: Iterable[str]) -> int:
+        """Add drug names mined from guideline text to the lexicon; returns the lexicon size"""
+        mined: Set[str] = set()
+        for document in documents:
+            for word in _WORD_RE.findall(_normalize(document)):
+                for part in re.split(r"[-/]", word):
+                    if len(part) >= 6 and part.endswith(DRUG_SUFFIXES):
+                        mined.add(part)
+        self._build(mined)
+        logger.info(f"Drug lexicon built: {self.lexicon_size} terms ({len(mined)} mined from guidelines)")
+        return self.lexicon_size
+
+    def extract(self, text: str) -> List[str]:
+        """Return drug names found in text, as title-cased generic names in order of appearance"""
+        with self._lock:
+            canonical = self._canonical
+            automaton = self._automaton
+            fuzzy_index = self._fuzzy_index
+
+        normalized = _normalize(text)
+
+        # Leftmost-longest, non-overlapping exact matches on word boundaries
+        candidates = [
+            (start, end, pattern)
+            for start, end, pattern in automaton.find_all(normalized)
+            if _is_boundary(normalized, start - 1) and _is_boundary(normalized, end)
+        ]
+        candidates.sort(key=lambda match: (match[0], -(match[1] - match[0])))
+
+        found: List[Tuple[int, str]] = []
+        spans: List[Tuple[int, int]] = []
+        for start, end, pattern in candidates:
+            if spans and start < spans[-1][1]:
+                continue
+            found.append((start, canonical[pattern]))
+            spans.append((start, end))
+
+        if self.fuzzy:
+            for word_match in re.finditer(r"[a-z]+", normalized):
+                word = word_match.group()
+                if len(word) < 6 or word in canonical:
+                    continue
+                start, end = word_match.span()
+                if any(start < span_end and span_start < end for span_start, span_end in spans):
+                    continue
+                max_distance = 1 if len(word) < 9 else 2
+                for term in fuzzy_index.get(word[0], ()):
+                    if _within_distance(word, term, max_distance):
+                        found.append((start, canonical[term]))
+                        break
+
+        found.sort()
+        drugs: List[str] = []
+        seen: Set[str] = set()
+        for _, name in found:
+            if name not in seen:
+                seen.add(name)
+                drugs.append(name.title())
+        return drugs
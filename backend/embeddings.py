@@ -0,0 +1,182 @@
+import os
+import logging
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Backends loaded by a parent process before it forks workers (gunicorn
+# preloading); forked workers reuse them and share the weights copy-on-write
+_preloaded: Dict[str, "EmbeddingBackend"] = {}
+
+
+def embedding_tag(backend: str, model_name: str, quantize: bool = True) -> str:
+    """Identifier stored with an index so vectors from different encoders are never mixed.
+
+    The default PyTorch backend is tagged with the bare model name, which is
+    what indexes built before backends were pluggable recorded.
+    """
+    if backend == "sentence-transformers":
+        return model_name
+    if backend == "onnx":
+        return f"{model_name}@onnx-{'int8' if quantize else 'fp32'}"
+    raise ValueError(f"Unknown EMBEDDING_BACKEND: {backend}")
+
+
+class EmbeddingBackend:
+    """Encodes text to L2-normalised float32 vectors"""
+
+    tag: str = ""
+
+    def encode(self, texts: List[str]) -> np.ndarray:
+        raise NotImplementedError
+
+
+class SentenceTransformerBackend(EmbeddingBackend):
+    """sentence-transformers on PyTorch (the default)"""
+
+    def __init__(self, model_name: str, threads: int = 0, max_batch_size: int = 64):
+        import torch
+        from sentence_transformers import SentenceTransformer
+
+        if threads > 0:
+            torch.set_num_threads(threads)
+        self.model = SentenceTransformer(model_name, device="cpu")
+        self.max_batch_size = max_batch_size
+        self.tag = embedding_tag("sentence-transformers", model_name)
+
+    def encode(self, texts: List[str]) -> np.ndarray:
+        return np.asarray(
+            self.model.encode(texts, batch_size=self.max_batch_size),
+            dtype=np.float32
+        )
+
+
+class OnnxBackend(EmbeddingBackend):
+    """ONNX Runtime inference of a sentence-transformers model, optionally int8-quantized.
+
+    On first use the model is exported to ONNX (and dynamically quantized)
+    under ``export_dir``; later starts load the exported file directly.
+    Pooling is the mean over the attention mask followed by L2
+    normalisation, matching all-MiniLM-L6-v2.
+    """
+
+    def __init__(self, model_name: str, threads: int = 0, max_batch_size: int = 64,
+                 quantize: bool = True, export_dir: str = "./models/onnx",
+                 max_seq_length: int = 256):
+        try:
+            import onnxruntime as ort
+        except ImportError:
+            raise RuntimeError("EMBEDDING_BACKEND=onnx requires the 'onnxruntime' package")
+        from transformers import AutoTokenizer
+
+        self.max_batch_size = max_batch_size
+        self.max_seq_length = max_seq_length
+        self.tag = embedding_tag("onnx", model_name, quantize)
+
+        model_dir = Path(export_dir) / model_name.replace("/", "__")
+        model_path = self._ensure_exported(model_name, model_dir, quantize)
+        self.tokenizer = AutoTokenizer.from_pretrained(model_name)
+
+        options = ort.SessionOptions()
+        if threads > 0:
+            options.intra_op_num_threads = threads
+            options.inter_op_num_threads = 1
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        self.session = ort.InferenceSession(str(model_path), options, providers=["CPUExecutionProvider"])
+        self.input_names = {model_input.name for model_input in self.session.get_inputs()}
+        logger.info(f"Loaded ONNX embedding model from {model_path}")
+
+    @staticmethod
+    def _ensure_exported(model_name: str, model_dir: Path, quantize: bool) -> Path:
+        fp32_path = model_dir / "model.onnx"
+        int8_path = model_dir / "model.int8.onnx"
+        target = int8_path if quantize else fp32_path
+        if target.exists():
+            return target
+
+        model_dir.mkdir(parents=True, exist_ok=True)
+        if not fp32_path.exists():
+            import torch
+            from transformers import AutoModel, AutoTokenizer
+
+            logger.info(f"Exporting {model_name} to ONNX...")
+            tokenizer = AutoTokenizer.from_pretrained(model_name)
+            model = AutoModel.from_pretrained(model_name).eval()
+            sample = tokenizer(["export"], return_tensors="pt")
+            tmp_path = fp32_path.with_suffix(".tmp")
+            torch.onnx.export(
+                model,
+                (sample["input_ids"], sample["attention_mask"], sample["token_type_ids"]),
+                str(tmp_path),
+                input_names=["input_ids", "attention_mask", "token_type_ids"],
+                output_names=["last_hidden_state"],
+                dynamic_axes={
+                    "input_ids": {0: "batch", 1: "sequence"},
+                    "attention_mask": {0: "batch", 1: "sequence"},
+                    "token_type_ids": {0: "batch", 1: "sequence"},
+                    "last_hidden_state": {0: "batch", 1: "sequence"},
+                },
+                opset_version=14
+            )
+            os.replace(tmp_path, fp32_path)
+
+        if quantize:
+            from onnxruntime.quantization import QuantType, quantize_dynamic
+
+            logger.info(f"Quantizing {model_name} to int8...")
+            tmp_path = int8_path.with_suffix(".tmp")
+            quantize_dynamic(str(fp32_path), str(tmp_path), weight_type=QuantType.QInt8)
+            os.replace(tmp_path, int8_path)
+
+        return target
+
+    def encode(self, texts: List[str]) -> np.ndarray:
+        batches = []
+        for start in range(0, len(texts), self.max_batch_size):
+            tokens = self.tokenizer(
+                texts[start:start + self.max_batch_size],
+                padding=True,
+                truncation=True,
+                max_length=self.max_seq_length,
+                return_tensors="np"
+            )
+            inputs = {name: tokens[name].astype(np.int64) for name in self.input_names if name in tokens}
+            hidden = self.session.run(None, inputs)[0]
+
+            mask = tokens["attention_mask"].astype(np.float32)[..., None]
+            pooled = (hidden * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None)
+            norms = np.linalg.norm(pooled, axis=1, keepdims=True)
+            batches.append((pooled / np.clip(norms, 1e-12, None)).astype(np.float32))
+
+        if not batches:
+            return np.zeros((0, 0), dtype=np.float32)
+        return np.vstack(batches)
+
+
+def create_embedding_backend(backend: str, model_name: str, threads: int = 0,
+                             max_batch_size: int = 64, quantize: bool = True,
+                             export_dir: Optional[str] = None) -> EmbeddingBackend:
+    """Instantiate the configured embedding backend"""
+    if backend == "sentence-transformers":
+        return SentenceTransformerBackend(model_name, threads=threads, max_batch_size=max_batch_size)
+    if backend == "onnx":
+        return OnnxBackend(
+            model_name,
+            threads=threads,
+            max_batch_size=max_batch_size,
+            quantize=quantize,
+            export_dir=export_dir or "./models/onnx"
+        )
+    raise ValueError(f"Unknown EMBEDDING_BACKEND: {backend}")
+
+
+def preload_embedding_backend(backend: EmbeddingBackend) -> None:
+    """Make ``backend`` available to VectorService instances in this process and its forks"""
+    _preloaded[backend.tag] = backend
+
+
+def preloaded_embedding_backend(tag: str) -> Optional[EmbeddingBackend]:
+    return _preloaded.get(tag)
@@ -1,20 +1,172 @@
+import os
 import httpx
 import json
+import time
+import base64
+import asyncio
+import hashlib
 import logging
-from typing import List, Dict, Any, Optional
+from datetime import datetime, timezone, timedelta
+from typing import List, Dict, Any, Optional, AsyncIterator
 from pathlib import Path
 
+from .drug_extractor import DrugExtractor
+from .cache import PersistentCache
+from .admission import Coalescer
+from . import metrics
+
 logger = logging.getLogger(__name__)
 
+# Bump when the corresponding prompt changes so cached answers are not reused
+EXTRACTION_PROMPT_VERSION = "1"
+SUMMARY_PROMPT_VERSION = "1"
+
+# Shortest wait between background token refreshes
+MIN_REFRESH_INTERVAL = 5.0
+
 class HeidiService:
     """Service for interacting with Heidi API"""
     
     def __init__(self):
-        # Load API key from environment or use staging key
-        self.api_key = "MI0QanRHLm4ovFkBVqcBrx3LCiWLT8eu"  # Staging key from docs
-        self.base_url = "https://registrar.api.heidihealth.com/api/v2/ml-scribe/open-api"
+        # Endpoint and credentials; the defaults are the staging key and test
+        # user from the Heidi docs. Point HEIDI_BASE_URL at benchmarks/mock_heidi.py
+        # to run offline.
+        self.api_key = os.getenv("HEIDI_API_KEY", "MI0QanRHLm4ovFkBVqcBrx3LCiWLT8eu")
+        self.base_url = os.getenv("HEIDI_BASE_URL", "https://registrar.api.heidihealth.com/api/v2/ml-scribe/open-api")
+        self.user_email = os.getenv("HEIDI_USER_EMAIL", "test@heidihealth.com")
+        self.third_party_internal_id = os.getenv("HEIDI_THIRD_PARTY_ID", "123")
         self.jwt_token = None
-        self.session_id = None
+        self.token_expires_at: Optional[datetime] = None
+        self.token_lifetime: Optional[float] = None
+        
+        # Refresh the JWT this many seconds before it expires; assume this
+        # lifetime when neither the response nor the token carries an expiry
+        self.token_refresh_margin = float(os.getenv("HEIDI_TOKEN_REFRESH_MARGIN", "300"))
+        self.default_token_ttl = float(os.getenv("HEIDI_DEFAULT_TOKEN_TTL", "3600"))
+        self._auth_lock = asyncio.Lock()
+        self._refresh_task: Optional[asyncio.Task] = None
+        
+        # Pool of Heidi sessions; each concurrent ask-ai call checks one out.
+        # A slot is held for as long as a session is checked out, so dropping
+        # a session or failing to create one frees capacity for waiters
+        self.session_pool_size = int(os.getenv("HEIDI_SESSION_POOL_SIZE", "4"))
+        self._idle_sessions: asyncio.Queue = asyncio.Queue()
+        self._session_slots = asyncio.Semaphore(self.session_pool_size)
+        
+        # One long-lived client per service so upstream calls reuse TCP/TLS connections
+        self.client: Optional[httpx.AsyncClient] = None
+        self.limits = httpx.Limits(
+            max_connections=int(os.getenv("HEIDI_MAX_CONNECTIONS", "20")),
+            max_keepalive_connections=int(os.getenv("HEIDI_MAX_KEEPALIVE_CONNECTIONS", "10")),
+            keepalive_expiry=float(os.getenv("HEIDI_KEEPALIVE_EXPIRY", "60"))
+        )
+        self.timeout = httpx.Timeout(
+            connect=float(os.getenv("HEIDI_CONNECT_TIMEOUT", "5")),
+            read=float(os.getenv("HEIDI_READ_TIMEOUT", "30")),
+            write=float(os.getenv("HEIDI_WRITE_TIMEOUT", "10")),
+            pool=float(os.getenv("HEIDI_POOL_TIMEOUT", "5"))
+        )
+        self.http2 = os.getenv("HEIDI_HTTP2", "true").lower() in ("1", "true", "yes")
+        
+        # "heidi" (default) always asks Heidi, which reports every medication.
+        # "local" and "hybrid" use the dictionary matcher, which only knows
+        # antimicrobials; "hybrid" asks Heidi only when it finds nothing
+        self.extraction_mode = os.getenv("DRUG_EXTRACTION_MODE", "heidi")
+        if self.extraction_mode not in ("local", "heidi", "hybrid"):
+            raise ValueError(f"Unknown DRUG_EXTRACTION_MODE: {self.extraction_mode}")
+        self.local_extractor = DrugExtractor()
+        
+        # Extraction and summary answers persisted across restarts, keyed on
+        # the input, the prompt version and the corpus generation
+        self.corpus_generation = 0
+        self.response_cache: Optional[PersistentCache] = None
+        
+        # Identical extraction or summary calls already in flight share one
+        # upstream request instead of racing to fill the same cache entry
+        self.coalesce = os.getenv("HEIDI_COALESCE", "true").lower() in ("1", "true", "yes")
+        self._extraction_calls = Coalescer("heidi_extraction")
+        self._summary_calls = Coalescer("heidi_summary")
+        if os.getenv("HEIDI_CACHE_ENABLED", "true").lower() in ("1", "true", "yes"):
+            self.response_cache = PersistentCache(
+                path=os.getenv("HEIDI_CACHE_PATH", "./cache/heidi_cache.sqlite3"),
+                max_entries=int(os.getenv("HEIDI_CACHE_MAX_ENTRIES", "5000")),
+                ttl_seconds=float(os.getenv("HEIDI_CACHE_TTL", str(7 * 24 * 3600)))
+            )
+    
+    async def start(self) -> None:
+        """Open the pooled HTTP client"""
+        if self.client is not None:
+            return
+        
+        http2 = self.http2
+        if http2:
+            try:
+                import h2  # noqa: F401
+            except ImportError:
+                logger.warning("HTTP/2 requested but the 'h2' package is not installed; using HTTP/1.1")
+                http2 = False
+        
+        self.client = httpx.AsyncClient(
+            base_url=self.base_url,
+            limits=self.limits,
+            timeout=self.timeout,
+            http2=http2
+        )
+        logger.info(f"Opened Heidi HTTP client (http2={http2})")
+        
+        self._refresh_task = asyncio.create_task(self._refresh_token_loop())
+    
+    async def close(self) -> None:
+        """Stop the token refresher and close the pooled HTTP client"""
+        if self._refresh_task is not None:
+            self._refresh_task.cancel()
+            self._refresh_task = None
+        if self.client is not None:
+            await self.client.aclose()
+            self.client = None
+        if self.response_cache is not None:
+            self.response_cache.close()
+    
+    def _cache_key(self, kind: str, prompt_version: str, *parts: str) -> str:
+        digest = hashlib.sha256()
+        for part in (kind, prompt_version, str(self.corpus_generation), *parts):
+            digest.update(part.encode("utf-8"))
+            digest.update(b"\0")
+        return digest.hexdigest()
+    
+    async def _cache_get(self, key: str) -> Optional[str]:
+        if self.response_cache is None:
+            return None
+        try:
+            return await asyncio.to_thread(self.response_cache.get, key)
+        except Exception as e:
+            logger.warning(f"Heidi cache read failed: {str(e)}")
+            return None
+    
+    async def _cache_put(self, key: str, value: str, kind: str) -> None:
+        if self.response_cache is None:
+            return
+        try:
+            await asyncio.to_thread(self.response_cache.put, key, value, kind)
+        except Exception as e:
+            logger.warning(f"Heidi cache write failed: {str(e)}")
+    
+    def cache_stats(self) -> Dict[str, Any]:
+        """Counters for the persisted extraction/summary cache"""
+        if self.response_cache is None:
+            return {"enabled": False}
+        return {"enabled": True, **self.response_cache.stats()}
+    
+    async def purge_cache(self, kind: Optional[str] = None) -> int:
+        """Delete cached extraction/summary answers; returns the number removed"""
+        if self.response_cache is None:
+            return 0
+        return await asyncio.to_thread(self.response_cache.purge, kind)
+    
+    async def _get_client(self) -> httpx.AsyncClient:
+        if self.client is None:
+            await self.start()
+        return self.client
         
     async def authenticate(self) -> bool:
         """Authenticate with Heidi API and get JWT token"""
@@ -24,175 +176,440 @@ class HeidiService:
             }
             
             params = {
-                "email": "test@heidihealth.com",
-                "third_party_internal_id": "123"
+                "email": self.user_email,
+                "third_party_internal_id": self.third_party_internal_id
             }
             
-            async with httpx.AsyncClient() as client:
+            client = await self._get_client()
+            with metrics.observe(metrics.HEIDI_REQUEST_SECONDS, phase="auth"):
                 response = await client.get(
-                    f"{self.base_url}/jwt",
+                    "/jwt",
                     headers=headers,
                     params=params
                 )
-                
-                if response.status_code == 200:
-                    data = response.json()
-                    self.jwt_token = data.get("token")
-                    logger.info("Successfully authenticated with Heidi API")
-                    return True
-                else:
-                    logger.error(f"Authentication failed: {response.status_code} - {response.text}")
-                    return False
+            metrics.HEIDI_RESPONSES.labels(phase="auth", status=str(response.status_code)).inc()
+            
+            if response.status_code == 200:
+                data = response.json()
+                self.jwt_token = data.get("token")
+                self.token_expires_at = self._token_expiry(data)
+                self.token_lifetime = (self.token_expires_at - datetime.now(timezone.utc)).total_seconds()
+                logger.info(f"Successfully authenticated with Heidi API (token expires {self.token_expires_at.isoformat()})")
+                return True
+            else:
+                logger.error(f"Authentication failed: {response.status_code} - {response.text}")
+                return False
                     
         except Exception as e:
             logger.error(f"Authentication error: {str(e)}")
             return False
     
-    async def create_session(self) -> bool:
-        """Create a new Heidi session"""
-        if not self.jwt_token:
-            if not await self.authenticate():
-                return False
+    def _token_expiry(self, data: Dict[str, Any]) -> datetime:
+        """Expiry from the /jwt response, else the token's exp claim, else the default TTL"""
+        expiration_time = data.get("expiration_time")
+        if expiration_time:
+            try:
+                expires_at = datetime.fromisoformat(expiration_time.replace("Z", "+00:00"))
+                if expires_at.tzinfo is None:
+                    expires_at = expires_at.replace(tzinfo=timezone.utc)
+                return expires_at
+            except ValueError:
+                logger.warning(f"Unparseable token expiration_time: {expiration_time}")
         
         try:
+            payload = self.jwt_token.split(".")[1]
+            claims = json.loads(base64.urlsafe_b64decode(payload + "=" * (-len(payload) % 4)))
+            return datetime.fromtimestamp(claims["exp"], tz=timezone.utc)
+        except Exception:
+            return datetime.now(timezone.utc) + timedelta(seconds=self.default_token_ttl)
+    
+    def _refresh_margin(self) -> float:
+        """Refresh margin, capped at half the token's lifetime so short-lived tokens are still used"""
+        if self.token_lifetime is None:
+            return self.token_refresh_margin
+        return min(self.token_refresh_margin, max(self.token_lifetime, 0.0) / 2)
+    
+    def _token_is_fresh(self) -> bool:
+        if not self.jwt_token or self.token_expires_at is None:
+            return False
+        remaining = (self.token_expires_at - datetime.now(timezone.utc)).total_seconds()
+        return remaining > self._refresh_margin()
+    
+    async def ensure_token(self, stale_token: Optional[str] = None) -> bool:
+        """Make sure a valid JWT is held, authenticating at most once across concurrent callers.
+        
+        Passing ``stale_token`` forces a refresh if that token is still the
+        current one (e.g. after the API answered 401).
+        """
+        if self._token_is_fresh() and (stale_token is None or self.jwt_token != stale_token):
+            return True
+        
+        async with self._auth_lock:
+            if self._token_is_fresh() and (stale_token is None or self.jwt_token != stale_token):
+                return True
+            return await self.authenticate()
+    
+    async def _refresh_token_loop(self) -> None:
+        """Refresh the JWT in the background shortly before it expires"""
+        while True:
+            try:
+                if self.token_expires_at is None:
+                    delay = 30.0
+                else:
+                    remaining = (self.token_expires_at - datetime.now(timezone.utc)).total_seconds()
+                    # The floor keeps an already-expired or zero-lifetime token
+                    # from turning this into a tight authentication loop
+                    delay = max(remaining - self._refresh_margin(), MIN_REFRESH_INTERVAL)
+                await asyncio.sleep(delay)
+                
+                if not await self.ensure_token():
+                    # Keep the current token and try again shortly
+                    await asyncio.sleep(30.0)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Token refresh error: {str(e)}")
+                await asyncio.sleep(30.0)
+    
+    async def create_session(self) -> Optional[str]:
+        """Create a new Heidi session and return its ID"""
+        if not await self.ensure_token():
+            return None
+        
+        try:
+            token = self.jwt_token
             headers = {
-                "Authorization": f"Bearer {self.jwt_token}",
+                "Authorization": f"Bearer {token}",
                 "Content-Type": "application/json"
             }
             
-            async with httpx.AsyncClient() as client:
-                response = await client.post(
-                    f"{self.base_url}/sessions",
-                    headers=headers
-                )
-                
-                if response.status_code == 200:
-                    data = response.json()
-                    self.session_id = data.get("session_id")
-                    logger.info(f"Created Heidi session: {self.session_id}")
-                    return True
-                else:
-                    logger.error(f"Session creation failed: {response.status_code} - {response.text}")
-                    return False
+            client = await self._get_client()
+            response = await self._timed_post(client, "session", "/sessions", headers=headers)
+            
+            if response.status_code == 401 and await self.ensure_token(stale_token=token):
+                headers["Authorization"] = f"Bearer {self.jwt_token}"
+                response = await self._timed_post(client, "session", "/sessions", headers=headers)
+            
+            if response.status_code == 200:
+                data = response.json()
+                session_id = data.get("session_id")
+                logger.debug(f"Created Heidi session: {session_id}")
+                return session_id
+            else:
+                logger.error(f"Session creation failed: {response.status_code} - {response.text}")
+                return None
                     
         except Exception as e:
             logger.error(f"Session creation error: {str(e)}")
-            return False
+            return None
+    
+    async def _acquire_session(self) -> Optional[str]:
+        """Check out an idle session, or create one; waits while the pool is fully checked out"""
+        await self._session_slots.acquire()
+        try:
+            return self._idle_sessions.get_nowait()
+        except asyncio.QueueEmpty:
+            pass
+        
+        # Give the slot back on failure and on cancellation (a timed-out or
+        # disconnected caller), or the pool shrinks for good
+        try:
+            session_id = await self.create_session()
+        except BaseException:
+            self._session_slots.release()
+            raise
+        if session_id is None:
+            self._session_slots.release()
+        return session_id
+    
+    def _release_session(self, session_id: str, reusable: bool = True) -> None:
+        """Return a session to the pool, or drop it so a fresh one gets created"""
+        if reusable:
+            self._idle_sessions.put_nowait(session_id)
+        self._session_slots.release()
+    
+    @staticmethod
+    async def _timed_post(client: httpx.AsyncClient, phase: str, url: str, **kwargs) -> httpx.Response:
+        """POST recorded in the Heidi latency histogram and response counter"""
+        with metrics.observe(metrics.HEIDI_REQUEST_SECONDS, phase=phase):
+            response = await client.post(url, **kwargs)
+        metrics.HEIDI_RESPONSES.labels(phase=phase, status=str(response.status_code)).inc()
+        return response
+    
+    async def _post_ask_ai(self, session_id: str, payload: Dict[str, Any]) -> httpx.Response:
+        """POST ask-ai, re-authenticating and retrying once on 401"""
+        client = await self._get_client()
+        token = self.jwt_token
+        response = await self._timed_post(
+            client,
+            "ask_ai",
+            f"/sessions/{session_id}/ask-ai",
+            headers={"Authorization": f"Bearer {token}", "Content-Type": "application/json"},
+            json=payload
+        )
+        
+        if response.status_code == 401:
+            logger.warning("Heidi rejected the JWT; re-authenticating and retrying")
+            if await self.ensure_token(stale_token=token):
+                response = await self._timed_post(
+                    client,
+                    "ask_ai",
+                    f"/sessions/{session_id}/ask-ai",
+                    headers={"Authorization": f"Bearer {self.jwt_token}", "Content-Type": "application/json"},
+                    json=payload
+                )
+        return response
     
     async def ask_heidi(self, ai_command: str, content: str) -> Optional[str]:
         """Ask Heidi AI assistant with specific command and content"""
-        if not self.session_id:
-            if not await self.create_session():
-                return None
+        session_id = await self._acquire_session()
+        if not session_id:
+            return None
         
+        reusable = True
         try:
-            headers = {
-                "Authorization": f"Bearer {self.jwt_token}",
-                "Content-Type": "application/json"
+            payload = {
+                "ai_command_text": ai_command,
+                "content": content,
+                "content_type": "MARKDOWN"
             }
             
+            response = await self._post_ask_ai(session_id, payload)
+            
+            if response.status_code == 404:
+                # Session expired upstream; replace it and retry once
+                logger.warning(f"Heidi session {session_id} not found; creating a new one")
+                self._release_session(session_id, reusable=False)
+                session_id = None
+                session_id = await self._acquire_session()
+                if not session_id:
+                    return None
+                response = await self._post_ask_ai(session_id, payload)
+            
+            if response.status_code == 200:
+                # Handle both streamed and regular JSON responses
+                full_response = ""
+                
+                # Try parsing as regular JSON first
+                try:
+                    json_data = response.json()
+                    if isinstance(json_data, dict):
+                        # Check for common response fields
+                        if 'response' in json_data:
+                            full_response = json_data['response']
+                        elif 'data' in json_data:
+                            full_response = json_data['data']
+                        elif 'content' in json_data:
+                            full_response = json_data['content']
+                        elif 'message' in json_data:
+                            full_response = json_data['message']
+                        else:
+                            # If it's a simple string response
+                            full_response = str(json_data)
+                    else:
+                        full_response = str(json_data)
+                except json.JSONDecodeError:
+                    # Handle as Server-Sent Events (SSE) streamed response
+                    for line in response.text.split('\n'):
+                        full_response += self._parse_stream_line(line)
+                
+                # If still empty, use the raw response text
+                if not full_response.strip():
+                    full_response = response.text
+                
+                logger.debug(f"Processed response: {full_response[:200]}...")
+                return full_response.strip()
+            else:
+                logger.error(f"Ask Heidi failed: {response.status_code} - {response.text}")
+                return None
+                
+        except Exception as e:
+            logger.error(f"Ask Heidi error: {str(e)}")
+            reusable = False
+            return None
+        finally:
+            if session_id:
+                self._release_session(session_id, reusable=reusable)
+    
+    @staticmethod
+    def _parse_stream_line(line: str) -> str:
+        """Text carried by one line of a streamed (SSE or JSON-lines) ask-ai response"""
+        line = line.strip()
+        if not line:
+            return ""
+        
+        text = ""
+        # Handle SSE format: "data: {json}"
+        if line.startswith('data: '):
+            sse_data = line[6:]  # Remove "data: " prefix
+            try:
+                data = json.loads(sse_data)
+                # Extract the actual text content
+                if isinstance(data, dict):
+                    if 'data' in data:
+                        text += data['data']
+                    elif 'content' in data:
+                        text += data['content']
+                    elif 'response' in data:
+                        text += data['response']
+                    elif 'message' in data:
+                        text += data['message']
+                    else:
+                        # Try to get any string value from the object
+                        for key, value in data.items():
+                            if isinstance(value, str) and value.strip():
+                                text += value
+                elif isinstance(data, str):
+                    text += data
+            except json.JSONDecodeError:
+                # If not valid JSON after "data: ", treat as plain text
+                text += sse_data
+        else:
+            # Handle other line formats
+            try:
+                data = json.loads(line)
+                if isinstance(data, dict):
+                    if 'data' in data:
+                        text += data['data']
+                    elif 'response' in data:
+                        text += data['response']
+                elif isinstance(data, str):
+                    text += data
+            except json.JSONDecodeError:
+                # If not JSON, treat as plain text (but skip common SSE markers)
+                if not line.startswith(('event:', 'id:', 'retry:')):
+                    text += line + "\n"
+        return text
+    
+    async def stream_heidi(self, ai_command: str, content: str) -> AsyncIterator[str]:
+        """Ask Heidi and yield response text incrementally as the upstream streams it.
+        
+        Failures before any text is yielded end the stream empty; a failure
+        part way through is re-raised, so callers never mistake a truncated
+        answer for a complete one.
+        """
+        session_id = await self._acquire_session()
+        if not session_id:
+            return
+        
+        reusable = True
+        yielded = False
+        try:
             payload = {
                 "ai_command_text": ai_command,
                 "content": content,
                 "content_type": "MARKDOWN"
             }
+            client = await self._get_client()
             
-            async with httpx.AsyncClient(timeout=30.0) as client:
-                response = await client.post(
-                    f"{self.base_url}/sessions/{self.session_id}/ask-ai",
-                    headers=headers,
+            # Re-authenticate once on 401 and replace the session once on 404
+            retried_auth = replaced_session = False
+            while True:
+                token = self.jwt_token
+                started = time.perf_counter()
+                first_token = True
+                async with client.stream(
+                    "POST",
+                    f"/sessions/{session_id}/ask-ai",
+                    headers={"Authorization": f"Bearer {token}", "Content-Type": "application/json"},
                     json=payload
-                )
-                
-                if response.status_code == 200:
-                    # Log the raw response for debugging
-                    logger.info(f"Raw response text: {response.text[:500]}...")
+                ) as response:
+                    metrics.HEIDI_RESPONSES.labels(phase="stream", status=str(response.status_code)).inc()
+                    if response.status_code == 401 and not retried_auth:
+                        retried_auth = True
+                        await response.aread()
+                        logger.warning("Heidi rejected the JWT; re-authenticating and retrying")
+                        if await self.ensure_token(stale_token=token):
+                            continue
                     
-                    # Handle both streamed and regular JSON responses
-                    full_response = ""
+                    if response.status_code == 404 and not replaced_session:
+                        # Session expired upstream; replace it and retry once
+                        replaced_session = True
+                        await response.aread()
+                        logger.warning(f"Heidi session {session_id} not found; creating a new one")
+                        self._release_session(session_id, reusable=False)
+                        session_id = None
+                        session_id = await self._acquire_session()
+                        if not session_id:
+                            return
+                        continue
+                    
+                    if response.status_code != 200:
+                        body = await response.aread()
+                        logger.error(f"Ask Heidi stream failed: {response.status_code} - {body[:500]!r}")
+                        reusable = response.status_code != 404
+                        return
                     
-                    # Try parsing as regular JSON first
-                    try:
-                        json_data = response.json()
-                        if isinstance(json_data, dict):
-                            # Check for common response fields
-                            if 'response' in json_data:
-                                full_response = json_data['response']
-                            elif 'data' in json_data:
-                                full_response = json_data['data']
-                            elif 'content' in json_data:
-                                full_response = json_data['content']
-                            elif 'message' in json_data:
-                                full_response = json_data['message']
+                    if "application/json" in response.headers.get("content-type", ""):
+                        # Not actually streamed; hand back the whole answer at once
+                        data = json.loads(await response.aread())
+                        elapsed = time.perf_counter() - started
+                        metrics.HEIDI_REQUEST_SECONDS.labels(phase="first_token").observe(elapsed)
+                        metrics.HEIDI_REQUEST_SECONDS.labels(phase="stream").observe(elapsed)
+                        if isinstance(data, dict):
+                            for field in ('response', 'data', 'content', 'message'):
+                                if field in data:
+                                    yielded = True
+                                    yield str(data[field])
+                                    break
                             else:
-                                # If it's a simple string response
-                                full_response = str(json_data)
+                                yielded = True
+                                yield str(data)
                         else:
-                            full_response = str(json_data)
-                    except json.JSONDecodeError:
-                        # Handle as Server-Sent Events (SSE) streamed response
-                        for line in response.text.split('\n'):
-                            line = line.strip()
-                            if not line:
-                                continue
-                                
-                            # Handle SSE format: "data: {json}"
-                            if line.startswith('data: '):
-                                sse_data = line[6:]  # Remove "data: " prefix
-                                try:
-                                    data = json.loads(sse_data)
-                                    # Extract the actual text content
-                                    if isinstance(data, dict):
-                                        if 'data' in data:
-                                            full_response += data['data']
-                                        elif 'content' in data:
-                                            full_response += data['content']
-                                        elif 'response' in data:
-                                            full_response += data['response']
-                                        elif 'message' in data:
-                                            full_response += data['message']
-                                        else:
-                                            # Try to get any string value from the object
-                                            for key, value in data.items():
-                                                if isinstance(value, str) and value.strip():
-                                                    full_response += value
-                                    elif isinstance(data, str):
-                                        full_response += data
-                                except json.JSONDecodeError:
-                                    # If not valid JSON after "data: ", treat as plain text
-                                    full_response += sse_data
-                            else:
-                                # Handle other line formats
-                                try:
-                                    data = json.loads(line)
-                                    if isinstance(data, dict):
-                                        if 'data' in data:
-                                            full_response += data['data']
-                                        elif 'response' in data:
-                                            full_response += data['response']
-                                    elif isinstance(data, str):
-                                        full_response += data
-                                except json.JSONDecodeError:
-                                    # If not JSON, treat as plain text (but skip common SSE markers)
-                                    if not line.startswith(('event:', 'id:', 'retry:')):
-                                        full_response += line + "\n"
+                            yielded = True
+                            yield str(data)
+                        return
                     
-                    # If still empty, use the raw response text
-                    if not full_response.strip():
-                        full_response = response.text
-                    
-                    logger.info(f"Processed response: {full_response[:200]}...")
-                    return full_response.strip()
-                else:
-                    logger.error(f"Ask Heidi failed: {response.status_code} - {response.text}")
-                    return None
+                    async for line in response.aiter_lines():
+                        text = self._parse_stream_line(line)
+                        if text:
+                            if first_token:
+                                first_token = False
+                                metrics.HEIDI_REQUEST_SECONDS.labels(phase="first_token").observe(
+                                    time.perf_counter() - started
+                                )
+                            yielded = True
+                            yield text
+                    metrics.HEIDI_REQUEST_SECONDS.labels(phase="stream").observe(time.perf_counter() - started)
+                    return
                     
         except Exception as e:
-            logger.error(f"Ask Heidi error: {str(e)}")
-            return None
+            logger.error(f"Ask Heidi stream error: {str(e)}")
+            reusable = False
+            if yielded:
+                raise
+        finally:
+            if session_id:
+                self._release_session(session_id, reusable=reusable)
     
     async def extract_drugs(self, medical_text: str) -> List[str]:
-        """Extract drug names from medical text using Heidi"""
+        """Extract drug names from medical text using the configured extraction mode"""
+        if self.extraction_mode in ("local", "hybrid"):
+            drugs = self.local_extractor.extract(medical_text)
+            logger.debug(f"Locally extracted drugs: {drugs}")
+            if drugs or self.extraction_mode == "local":
+                return drugs
+        
+        return await self._extract_drugs_heidi(medical_text)
+    
+    async def _extract_drugs_heidi(self, medical_text: str) -> List[str]:
+        """Extract drug names from medical text using Heidi, consulting the cache first"""
+        cache_key = self._cache_key("extraction", EXTRACTION_PROMPT_VERSION, " ".join(medical_text.split()))
+        cached = await self._cache_get(cache_key)
+        if cached is not None:
+            return json.loads(cached)
+        
+        async def extract() -> Optional[List[str]]:
+            drugs = await self._ask_heidi_for_drugs(medical_text)
+            if drugs is not None:
+                await self._cache_put(cache_key, json.dumps(drugs), "extraction")
+            return drugs
+        
+        drugs = await (self._extraction_calls.run(cache_key, extract) if self.coalesce else extract())
+        return list(drugs or [])
+    
+    async def _ask_heidi_for_drugs(self, medical_text: str) -> Optional[List[str]]:
+        """Ask Heidi for the drugs in the text; None if Heidi gave no answer"""
         command = """You are a medical AI assistant. Please extract all medication names, drug names, and antibiotic names from the following medical text.
         
         Instructions:
@@ -205,7 +622,7 @@ class HeidiService:
         Example response: gentamicin, amoxicillin, ciprofloxacin"""
         
         response = await self.ask_heidi(command, medical_text)
-        logger.info(f"Heidi drug extraction response: {response}")
+        logger.debug(f"Heidi drug extraction response: {response}")
         
         if response:
             # Parse the response to extract drug names
@@ -273,23 +690,20 @@ class HeidiService:
                     seen.add(drug.lower())
                     unique_drugs.append(drug)
             
-            logger.info(f"Extracted drugs: {unique_drugs}")
+            logger.debug(f"Extracted drugs: {unique_drugs}")
             return unique_drugs
         
         logger.warning("No response from Heidi for drug extraction")
-        return []
+        return None
     
-    async def create_drug_summary(self, drugs: List[str], context_chunks: List[str]) -> str:
-        """Create a summary about drugs using context from vector database"""
-        if not drugs:
-            return "No drugs were identified in the provided medical text."
-        
+    def _summary_command(self, drugs: List[str], context_chunks: List[str]) -> str:
+        """Prompt asking Heidi for a clinical summary of the drugs, grounded in the context"""
         # Prepare context from vector chunks
         context = "\n\n".join([f"Context {i+1}: {chunk}" for i, chunk in enumerate(context_chunks)])
         
         drugs_list = ", ".join(drugs)
         
-        command = f"""Based on the following medical reference context, provide a brief clinical summary about these medications: {drugs_list}
+        return f"""Based on the following medical reference context, provide a brief clinical summary about these medications: {drugs_list}
         
         Include information about:
         - Indications and usage
@@ -301,8 +715,58 @@ class HeidiService:
         
         Reference Context:
         {context}"""
+    
+    async def create_drug_summary(self, drugs: List[str], context_chunks: List[str]) -> str:
+        """Create a summary about drugs using context from vector database"""
+        if not drugs:
+            return "No drugs were identified in the provided medical text."
         
+        drugs_list = ", ".join(drugs)
+        command = self._summary_command(drugs, context_chunks)
         medical_text = f"Medications identified: {drugs_list}"
         
-        response = await self.ask_heidi(command, medical_text)
+        cache_key = self._summary_cache_key(drugs, context_chunks)
+        cached = await self._cache_get(cache_key)
+        if cached is not None:
+            return cached
+        
+        async def summarize() -> Optional[str]:
+            response = await self.ask_heidi(command, medical_text)
+            if response:
+                await self._cache_put(cache_key, response, "summary")
+            return response
+        
+        response = await (self._summary_calls.run(cache_key, summarize) if self.coalesce else summarize())
         return response or f"Summary for medications: {drugs_list} (context processing completed)"
+    
+    def _summary_cache_key(self, drugs: List[str], context_chunks: List[str]) -> str:
+        drug_set = ",".join(sorted({drug.lower() for drug in drugs}))
+        return self._cache_key("summary", SUMMARY_PROMPT_VERSION, drug_set, *context_chunks)
+    
+    async def stream_drug_summary(self, drugs: List[str], context_chunks: List[str]) -> AsyncIterator[str]:
+        """Like create_drug_summary, but yields summary text as Heidi streams it"""
+        if not drugs:
+            yield "No drugs were identified in the provided medical text."
+            return
+        
+        drugs_list = ", ".join(drugs)
+        command = self._summary_command(drugs, context_chunks)
+        medical_text = f"Medications identified: {drugs_list}"
+        
+        cache_key = self._summary_cache_key(drugs, context_chunks)
+        cached = await self._cache_get(cache_key)
+        if cached is not None:
+            yield cached
+            return
+        
+        # stream_heidi raises if the answer is cut off, so only complete
+        # answers reach the cache
+        parts = []
+        async for text in self.stream_heidi(command, medical_text):
+            parts.append(text)
+            yield text
+        
+        if parts:
+            await self._cache_put(cache_key, "".join(parts).strip(), "summary")
+        else:
+            yield f"Summary for medications: {drugs_list} (context processing completed)"
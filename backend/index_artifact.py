@@ -0,0 +1,216 @@
+import os
+import io
+import json
+import time
+import gzip
+import shutil
+import tarfile
+import hashlib
+import logging
+import tempfile
+from pathlib import Path
+from datetime import datetime, timezone
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, Optional
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+FORMAT_VERSION = 1
+ARTIFACT_MANIFEST = "artifact.json"
+INSTALLED_MARKER = ".artifact_sha256"
+
+# Build-time and per-process files that never belong in an artifact
+_EXCLUDED = {"ingest.lock", INSTALLED_MARKER, ARTIFACT_MANIFEST}
+_EXCLUDED_SUFFIXES = (".tmp", ".old")
+
+
+def _sha256_file(path: Path) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _index_files(index_dir: Path):
+    for path in sorted(index_dir.rglob("*")):
+        relative = path.relative_to(index_dir)
+        if path.is_dir() or relative.name in _EXCLUDED:
+            continue
+        if any(part.endswith(_EXCLUDED_SUFFIXES) for part in relative.parts):
+            continue
+        yield relative.as_posix(), path
+
+
+def build_artifact(index_dir: Path, output: Path, version: str, metadata: Dict[str, Any]) -> Dict[str, Any]:
+    """Pack an index directory into a versioned, checksummed tar.gz.
+
+    The archive holds the index files plus ``artifact.json`` (format and
+    artifact version, ``metadata`` and the SHA-256 of every file). Entries
+    are sorted with fixed owners and timestamps and ``created_at`` honours
+    SOURCE_DATE_EPOCH, so identical index files give a byte-identical
+    archive. ``<output>.sha256`` is written next to
+    it. Returns the artifact manifest, with the archive checksum added.
+    """
+    index_dir = Path(index_dir)
+    output = Path(output)
+    files = {relative: {"sha256": _sha256_file(path), "size": path.stat().st_size}
+             for relative, path in _index_files(index_dir)}
+    manifest = {
+        "format": FORMAT_VERSION,
+        "version": version,
+        "created_at": datetime.fromtimestamp(
+            int(os.getenv("SOURCE_DATE_EPOCH", time.time())), timezone.utc
+        ).isoformat(),
+        **metadata,
+        "files": files,
+    }
+
+    def add(tar: tarfile.TarFile, name: str, data_path: Optional[Path] = None, data: Optional[bytes] = None):
+        info = tarfile.TarInfo(name)
+        info.size = data_path.stat().st_size if data_path is not None else len(data)
+        info.mtime = 0
+        info.mode = 0o644
+        info.uid = info.gid = 0
+        info.uname = info.gname = ""
+        if data_path is not None:
+            with open(data_path, "rb") as f:
+                tar.addfile(info, f)
+        else:
+            tar.addfile(info, io.BytesIO(data))
+
+    output.parent.mkdir(parents=True, exist_ok=True)
+    tmp_output = output.with_name(output.name + ".tmp")
+    with open(tmp_output, "wb") as raw, gzip.GzipFile(filename="", fileobj=raw, mode="wb", mtime=0) as compressed:
+        with tarfile.open(fileobj=compressed, mode="w", format=tarfile.PAX_FORMAT) as tar:
+            add(tar, ARTIFACT_MANIFEST, data=json.dumps(manifest, indent=2, sort_keys=True).encode("utf-8"))
+            for relative, path in _index_files(index_dir):
+                add(tar, relative, data_path=path)
+    os.replace(tmp_output, output)
+
+    checksum = _sha256_file(output)
+    Path(f"{output}.sha256").write_text(f"{checksum}  {output.name}\n", encoding="utf-8")
+    logger.info(f"Index artifact {output} written: version {version}, {len(files)} files, sha256 {checksum}")
+    return {**manifest, "sha256": checksum}
+
+
+def _fetch(source: str, destination: Path) -> None:
+    """Copy a local path or download an http(s) URL to ``destination``"""
+    if source.startswith(("http://", "https://")):
+        import httpx
+
+        with httpx.stream("GET", source, follow_redirects=True, timeout=httpx.Timeout(30, read=300)) as response:
+            response.raise_for_status()
+            with open(destination, "wb") as f:
+                for block in response.iter_bytes(1024 * 1024):
+                    f.write(block)
+    else:
+        shutil.copyfile(source, destination)
+
+
+def _published_checksum(source: str) -> Optional[str]:
+    """The checksum from ``<source>.sha256``, if it was published next to the artifact"""
+    try:
+        with tempfile.TemporaryDirectory() as scratch:
+            sidecar = Path(scratch) / "artifact.sha256"
+            _fetch(f"{source}.sha256", sidecar)
+            return sidecar.read_text(encoding="utf-8").split()[0]
+    except Exception:
+        return None
+
+
+def verify_extracted(directory: Path) -> Dict[str, Any]:
+    """Check every file listed in ``artifact.json`` against its size and SHA-256"""
+    with open(Path(directory) / ARTIFACT_MANIFEST, "r", encoding="utf-8") as f:
+        manifest = json.load(f)
+    if manifest.get("format") != FORMAT_VERSION:
+        raise ValueError(f"Unsupported index artifact format: {manifest.get('format')}")
+    for relative, expected in manifest["files"].items():
+        path = Path(directory) / relative
+        if not path.is_file() or path.stat().st_size != expected["size"] or _sha256_file(path) != expected["sha256"]:
+            raise ValueError(f"Index artifact file {relative} is missing or corrupt")
+    return manifest
+
+
+@contextmanager
+def _install_lock(target: Path) -> Iterator[None]:
+    """Serialise installs of the same target across processes (e.g. several workers booting)"""
+    with open(target.with_name(target.name + ".install.lock"), "a+") as lock_file:
+        if fcntl is not None:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+
+
+def _reuse_installed(target: Path, checksum: str) -> Optional[Dict[str, Any]]:
+    """Manifest of the artifact installed in ``target`` if it is ``checksum`` and still intact"""
+    try:
+        if (target / INSTALLED_MARKER).read_text(encoding="utf-8").strip() != checksum:
+            return None
+        manifest = verify_extracted(target)
+    except FileNotFoundError:
+        return None
+    except Exception as e:
+        logger.warning(f"Installed index artifact failed verification, reinstalling: {str(e)}")
+        return None
+    logger.info(f"Index artifact {checksum[:12]} is already installed in {target}")
+    return manifest
+
+
+def install_artifact(source: str, target: Path, expected_sha256: Optional[str] = None) -> Dict[str, Any]:
+    """Download, verify and unpack an index artifact into ``target``.
+
+    The archive is checked against ``expected_sha256`` or, failing that, a
+    published ``<source>.sha256``; every unpacked file is checked against
+    ``artifact.json``. The verified directory replaces ``target`` with a
+    rename. If ``target`` already holds the expected archive it is reused
+    without downloading. Returns the artifact manifest.
+    """
+    target = Path(target)
+    target.parent.mkdir(parents=True, exist_ok=True)
+    with _install_lock(target):
+        expected = (expected_sha256 or _published_checksum(source) or "").lower() or None
+        installed = _reuse_installed(target, expected) if expected else None
+        return installed or _download_and_install(source, target, expected)
+
+
+def _download_and_install(source: str, target: Path, expected: Optional[str]) -> Dict[str, Any]:
+    with tempfile.TemporaryDirectory(dir=target.parent) as scratch:
+        archive = Path(scratch) / "index.tar.gz"
+        _fetch(source, archive)
+        checksum = _sha256_file(archive)
+        if expected and checksum != expected:
+            raise ValueError(f"Index artifact checksum mismatch: expected {expected}, got {checksum}")
+        if not expected:
+            logger.warning(f"No published checksum for {source}; relying on the per-file checksums")
+        installed = None if expected else _reuse_installed(target, checksum)
+        if installed is not None:
+            return installed
+
+        unpacked = Path(scratch) / "index"
+        with tarfile.open(archive, "r:gz") as tar:
+            for member in tar.getmembers():
+                name = Path(member.name)
+                if name.is_absolute() or ".." in name.parts or not (member.isfile() or member.isdir()):
+                    raise ValueError(f"Refusing unsafe entry in index artifact: {member.name}")
+            tar.extractall(unpacked)
+        manifest = verify_extracted(unpacked)
+        (unpacked / INSTALLED_MARKER).write_text(checksum, encoding="utf-8")
+
+        old = target.with_name(target.name + ".old")
+        shutil.rmtree(old, ignore_errors=True)
+        if target.exists():
+            os.replace(target, old)
+        os.replace(unpacked, target)
+        shutil.rmtree(old, ignore_errors=True)
+
+    logger.info(f"Installed index artifact version {manifest['version']} ({checksum[:12]}) into {target}")
+    return manifest
@@ -0,0 +1,160 @@
+"""Build or update the vector index outside the web app.
+
+    python -m backend.ingest
+    python -m backend.ingest --references ./references --index-dir ./build/chroma_db \\
+        --concurrency 4 --workers 4 --matrix --artifact ./build/index.tar.gz
+    python -m backend.ingest --verify ./build/index.tar.gz
+
+Runs the same incremental ingestion as application startup, under the
+cross-process ingest lock, so it is safe alongside running workers (which
+pick up the new corpus generation on their next reload). With --artifact
+the finished index is packed into a versioned, checksummed archive that
+servers install at boot via VECTOR_INDEX_ARTIFACT. Exits non-zero if any
+PDF failed.
+"""
+import sys
+import time
+import hashlib
+import asyncio
+import logging
+import argparse
+import tempfile
+from pathlib import Path
+
+from .vector_service import VectorService
+from .index_artifact import build_artifact, install_artifact
+
+logger = logging.getLogger("backend.ingest")
+
+
+class Progress:
+    """Logs one line per finished PDF with a running ETA"""
+
+    def __init__(self, total: int):
+        self.total = total
+        self.done = 0
+        self.started = time.perf_counter()
+
+    def __call__(self, pdf_path: Path, status: str, seconds: float, chunks: int) -> None:
+        self.done += 1
+        elapsed = time.perf_counter() - self.started
+        remaining = elapsed / self.done * (self.total - self.done)
+        logger.info(
+            f"[{self.done}/{self.total}] {pdf_path.name}: {status}, {chunks} chunks in {seconds:.1f}s "
+            f"(elapsed {elapsed:.0f}s, ETA {remaining:.0f}s)"
+        )
+
+
+def configure(service: VectorService, args) -> None:
+    """Apply command-line overrides on top of the environment configuration"""
+    service.use_directories(args.references, args.index_dir)
+    # This process is the writer, even with the workers' environment
+    service.read_only = False
+    service.index_artifact = None
+    if args.concurrency:
+        service.ingest_concurrency = args.concurrency
+    if args.workers:
+        service.ingest_workers = args.workers
+        service.extract_lookahead = 2 * args.workers
+    if args.pages_per_task:
+        service.pages_per_task = args.pages_per_task
+    if args.embed_batch_size:
+        service.embed_batch_size = args.embed_batch_size
+    if args.threads:
+        service.embedding_threads = args.threads
+    if args.layout:
+        service.storage_layout = args.layout
+    if args.matrix:
+        service.read_engine = "matrix"
+        service.matrix_dtype = args.matrix_dtype
+
+
+def artifact_version(service: VectorService, manifest: dict) -> str:
+    """Generation plus a digest of the inputs: same PDFs and settings, same version"""
+    digest = hashlib.sha256(service._ingest_fingerprint().encode("utf-8"))
+    digest.update(service.storage_layout.encode("utf-8"))
+    for name in sorted(manifest["files"]):
+        digest.update(f"{name}:{manifest['files'][name].get('sha256', '')}".encode("utf-8"))
+    return f"{manifest.get('generation', 0)}-{digest.hexdigest()[:12]}"
+
+
+async def run(args) -> int:
+    service = VectorService()
+    configure(service, args)
+    await service.initialize(load_model=False)
+    pdfs = sorted(service.references_dir.glob("*.pdf")) if service.references_dir.exists() else []
+    logger.info(f"Indexing {len(pdfs)} PDFs from {service.references_dir} into {service.persist_directory}")
+    try:
+        result = await service.process_pdfs(on_progress=Progress(len(pdfs)))
+    finally:
+        await service.shutdown()
+
+    for detail in result.details:
+        logger.debug(detail)
+    logger.info(result.message)
+    if result.failed:
+        logger.error(f"{result.failed} PDFs failed; not writing an artifact")
+        return 1
+
+    if args.artifact:
+        manifest = service._load_manifest()
+        build_artifact(
+            service.persist_directory,
+            Path(args.artifact),
+            version=args.artifact_version or artifact_version(service, manifest),
+            metadata={
+                "embedding": service.embedding_tag,
+                "ingest_fingerprint": service._ingest_fingerprint(),
+                "storage_layout": service.storage_layout,
+                "corpus_generation": manifest.get("generation", 0),
+                "matrix_index": service.read_engine == "matrix",
+                "sources": {name: entry.get("sha256") for name, entry in sorted(manifest["files"].items())},
+            }
+        )
+    return 0
+
+
+def verify(path: str) -> int:
+    """Unpack an artifact into a scratch directory and check every checksum"""
+    with tempfile.TemporaryDirectory() as scratch:
+        try:
+            artifact = install_artifact(path, Path(scratch) / "index")
+        except Exception as e:
+            logger.error(f"Artifact {path} failed verification: {str(e)}")
+            return 1
+    logger.info(
+        f"Artifact {path} is valid: version {artifact['version']}, {len(artifact['files'])} files, "
+        f"embedding {artifact.get('embedding')}, layout {artifact.get('storage_layout')}"
+    )
+    return 0
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--references", type=Path, default=Path("references"), help="directory of PDFs")
+    parser.add_argument("--index-dir", type=Path, default=Path("chroma_db"), help="index directory to build or update")
+    parser.add_argument("--concurrency", type=int, help="PDFs processed at once (VECTOR_INGEST_CONCURRENCY)")
+    parser.add_argument("--workers", type=int, help="PDF parsing processes (VECTOR_INGEST_WORKERS)")
+    parser.add_argument("--pages-per-task", type=int, help="pages per extraction task (VECTOR_PAGES_PER_TASK)")
+    parser.add_argument("--embed-batch-size", type=int, help="chunks per embedding batch (VECTOR_EMBED_BATCH_SIZE)")
+    parser.add_argument("--threads", type=int, help="embedding inference threads (EMBEDDING_THREADS)")
+    parser.add_argument("--layout", choices=["per_document", "unified"], help="storage layout (VECTOR_STORAGE_LAYOUT)")
+    parser.add_argument("--matrix", action="store_true", help="also export the memory-mapped matrix index")
+    parser.add_argument("--matrix-dtype", choices=["float32", "int8"], default="float32")
+    parser.add_argument("--artifact", help="write the finished index to this .tar.gz (plus a .sha256 file)")
+    parser.add_argument("--artifact-version", help="artifact version (default: corpus generation and input digest)")
+    parser.add_argument("--verify", metavar="ARTIFACT", help="verify an artifact's checksums and exit")
+    parser.add_argument("-v", "--verbose", action="store_true")
+    return parser.parse_args(argv)
+
+
+def main(argv=None) -> None:
+    args = parse_args(argv)
+    logging.basicConfig(level=logging.DEBUG if args.verbose else logging.INFO)
+    if args.verify:
+        sys.exit(verify(args.verify))
+    sys.exit(asyncio.run(run(args)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+import re
+import math
+import heapq
+import logging
+import threading
+from collections import Counter
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+(?:[-/][a-z0-9]+)*")
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase word tokens; hyphenated/slashed compounds are kept whole and
+    also split, so "piperacillin-tazobactam" matches either component"""
+    tokens = []
+    for token in _TOKEN_RE.findall(text.lower()):
+        tokens.append(token)
+        if "-" in token or "/" in token:
+            tokens.extend(part for part in re.split(r"[-/]", token) if part)
+    return tokens
+
+
+class LexicalDocument(NamedTuple):
+    """A chunk as stored in the lexical index"""
+    chunk_id: str
+    collection: str
+    content: str
+    metadata: Dict[str, Any]
+    length: int
+
+
+class BM25Index:
+    """In-memory BM25 inverted index over stored chunks.
+
+    The index is rebuilt as a whole and swapped in atomically, so searches
+    running on worker threads never see a half-built index.
+    """
+
+    def __init__(self, k1: float = 1.5, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self._lock = threading.Lock()
+        self._documents: List[LexicalDocument] = []
+        self._postings: Dict[str, List[Tuple[int, int]]] = {}
+        self._idf: Dict[str, float] = {}
+        self._avg_length = 0.0
+
+    def build(self, chunks: Iterable[Tuple[str, str, str, Dict[str, Any]]]) -> int:
+        """Replace the index with (chunk_id, collection, content, metadata) records;
+        returns the number of chunks indexed"""
+        documents: List[LexicalDocument] = []
+        postings: Dict[str, List[Tuple[int, int]]] = {}
+        total_length = 0
+
+        for chunk_id, collection, content, metadata in chunks:
+            term_counts = Counter(tokenize(content))
+            length = sum(term_counts.values())
+            doc_index = len(documents)
+            documents.append(LexicalDocument(chunk_id, collection, content, metadata or {}, length))
+            total_length += length
+            for term, count in term_counts.items():
+                postings.setdefault(term, []).append((doc_index, count))
+
+        n_docs = len(documents)
+        idf = {
+            term: math.log(1 + (n_docs - len(entries) + 0.5) / (len(entries) + 0.5))
+            for term, entries in postings.items()
+        }
+
+        with self._lock:
+            self._documents = documents
+            self._postings = postings
+            self._idf = idf
+            self._avg_length = total_length / n_docs if n_docs else 0.0
+
+        logger.info(f"Lexical index built: {n_docs} chunks, {len(postings)} terms")
+        return n_docs
+
+    def __len__(self) -> int:
+        return len(self._documents)
+
+    def search(self, query: str, n_results: int,
+               sources: Optional[List[str]] = None) -> List[Tuple[LexicalDocument, float]]:
+        """Top documents for a query as (document, BM25 score), best first"""
+        with self._lock:
+            documents = self._documents
+            postings = self._postings
+            idf = self._idf
+            avg_length = self._avg_length
+
+        if not documents:
+            return []
+
+        allowed = set(sources) if sources else None
+        scores: Dict[int, float] = {}
+        for term in set(tokenize(query)):
+            entries = postings.get(term)
+            if not entries:
+                continue
+            term_idf = idf[term]
+            for doc_index, count in entries:
+                norm = self.k1 * (1 - self.b + self.b * documents[doc_index].length / avg_length)
+                scores[doc_index] = scores.get(doc_index, 0.0) + term_idf * count * (self.k1 + 1) / (count + norm)
+
+        if allowed is not None:
+            scores = {
+                doc_index: score for doc_index, score in scores.items()
+                if documents[doc_index].metadata.get("source") in allowed
+            }
+
+        best = heapq.nlargest(n_results, scores.items(), key=lambda item: item[1])
+        return [(documents[doc_index], score) for doc_index, score in best]
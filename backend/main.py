@@ -1,11 +1,24 @@
 from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, Response, StreamingResponse
+from prometheus_client import CONTENT_TYPE_LATEST, generate_latest
 from contextlib import asynccontextmanager
+from typing import Dict, List, Optional
+import os
+import time
+import json
+import asyncio
 import logging
 
 from .vector_service import VectorService
 from .heidi_service import HeidiService
-from .models import SearchRequest, SearchResponse, HeidiRequest, HeidiResponse
+from .context_packer import pack_context
+from .admission import AdmissionController, Coalescer, Overloaded
+from . import metrics
+from .models import (
+    SearchRequest, SearchResponse, BatchSearchRequest, BatchSearchResponse,
+    SearchResult, HeidiRequest, HeidiResponse, IngestJobStatus
+)
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -15,22 +28,138 @@ logger = logging.getLogger(__name__)
 vector_service = None
 heidi_service = None
 
+# /ask-heidi pipeline: drugs are searched in batches that run concurrently,
+# and every stage has its own timeout (seconds)
+SEARCH_BATCH_SIZE = int(os.getenv("ASK_HEIDI_SEARCH_BATCH_SIZE", "4"))
+SEARCH_CONCURRENCY = int(os.getenv("ASK_HEIDI_SEARCH_CONCURRENCY", "4"))
+EXTRACT_TIMEOUT = float(os.getenv("ASK_HEIDI_EXTRACT_TIMEOUT", "30"))
+SEARCH_TIMEOUT = float(os.getenv("ASK_HEIDI_SEARCH_TIMEOUT", "10"))
+SUMMARY_TIMEOUT = float(os.getenv("ASK_HEIDI_SUMMARY_TIMEOUT", "60"))
+# "vector" or "hybrid"; unset uses VECTOR_SEARCH_MODE
+SEARCH_MODE = os.getenv("ASK_HEIDI_SEARCH_MODE") or None
+# Approximate token budget for guideline context in the summary prompt
+CONTEXT_TOKEN_BUDGET = int(os.getenv("ASK_HEIDI_CONTEXT_TOKENS", "2000"))
+# Admission control: at most MAX_CONCURRENT pipelines run, at most MAX_QUEUE
+# wait for a slot (beyond that: 429), and a wait over QUEUE_TIMEOUT is a 503.
+# Identical notes already in flight share one pipeline run.
+MAX_CONCURRENT = int(os.getenv("ASK_HEIDI_MAX_CONCURRENT", "8"))
+MAX_QUEUE = int(os.getenv("ASK_HEIDI_MAX_QUEUE", "32"))
+QUEUE_TIMEOUT = float(os.getenv("ASK_HEIDI_QUEUE_TIMEOUT", "10"))
+COALESCE = os.getenv("ASK_HEIDI_COALESCE", "true").lower() in ("1", "true", "yes")
+
+# Seconds between checks for ingests done by other processes (the ingest
+# CLI or another worker); 0 disables
+RELOAD_INTERVAL = float(os.getenv("VECTOR_RELOAD_INTERVAL", "30"))
+
+admission = AdmissionController("ask_heidi", MAX_CONCURRENT, MAX_QUEUE, QUEUE_TIMEOUT)
+ask_heidi_calls = Coalescer("ask_heidi")
+
+async def on_corpus_changed() -> None:
+    """Propagate a corpus change: cache generation and local drug lexicon"""
+    heidi_service.corpus_generation = vector_service.corpus_generation
+    await refresh_drug_lexicon()
+
+async def open_index() -> None:
+    """Open the vector index and key the Heidi cache on its corpus generation at once"""
+    await vector_service.initialize(load_model=False)
+    # Before the lexicon phase, which does not gate /ready, the cache would
+    # otherwise read and write entries under generation 0
+    heidi_service.corpus_generation = vector_service.corpus_generation
+
+async def refresh_drug_lexicon() -> None:
+    """Rebuild the local drug lexicon from the ingested guideline chunks"""
+    await asyncio.to_thread(
+        heidi_service.local_extractor.build_from_corpus,
+        vector_service.iter_documents()
+    )
+
+# Startup phases run in the background so the server answers /health at
+# once; /ready reports each phase and gates on the ones search depends on
+startup_phases = {"index": "pending", "model": "pending", "ingest": "pending", "lexicon": "pending", "heidi": "pending"}
+READY_PHASES = ("index", "model", "ingest")
+startup_task: Optional[asyncio.Task] = None
+reload_task: Optional[asyncio.Task] = None
+
+async def run_phase(name: str, coro) -> bool:
+    """Await one startup phase, recording its state in startup_phases"""
+    startup_phases[name] = "running"
+    started = time.perf_counter()
+    try:
+        await coro
+    except Exception as e:
+        startup_phases[name] = "failed"
+        logger.error(f"Startup phase '{name}' failed: {str(e)}")
+        return False
+    startup_phases[name] = "ready"
+    logger.info(f"Startup phase '{name}' ready in {time.perf_counter() - started:.1f}s")
+    return True
+
+async def warm_up() -> None:
+    """Load the model, bring the index up to date and authenticate, concurrently"""
+    async def search():
+        # With an index artifact the index phase (download and verify) runs
+        # here rather than before serving; the model and ingest phases need it
+        if startup_phases["index"] != "ready":
+            if not await run_phase("index", open_index()):
+                return
+        await asyncio.gather(
+            run_phase("model", vector_service.ensure_model()),
+            index_and_lexicon()
+        )
+    
+    async def index_and_lexicon():
+        # Ingestion only needs the model when a PDF actually changed; a
+        # read-only worker loads the index another process ingested
+        ingest = vector_service.reload() if vector_service.read_only else vector_service.process_pdfs()
+        if await run_phase("ingest", ingest):
+            await run_phase("lexicon", on_corpus_changed())
+    
+    async def heidi():
+        await heidi_service.start()
+        if not await heidi_service.authenticate():
+            raise RuntimeError("Heidi authentication failed")
+    
+    await asyncio.gather(
+        search(),
+        run_phase("heidi", heidi())
+    )
+    logger.info("Application warm-up complete")
+
+async def watch_corpus() -> None:
+    """Periodically pick up ingests done by other processes"""
+    while True:
+        await asyncio.sleep(RELOAD_INTERVAL)
+        if startup_phases["ingest"] != "ready":
+            continue
+        try:
+            await vector_service.reload()
+        except Exception as e:
+            logger.warning(f"Index reload failed: {str(e)}")
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Manage the application lifespan"""
-    global vector_service, heidi_service
+    global vector_service, heidi_service, startup_task, reload_task
     
     # Startup
     logger.info("Starting up application...")
+    startup_phases.update(dict.fromkeys(startup_phases, "pending"))
     vector_service = VectorService()
     heidi_service = HeidiService()
     
-    # Initialize ChromaDB and process PDFs
-    await vector_service.initialize()
-    await vector_service.process_pdfs()
-    
-    # Initialize Heidi service (authenticate)
-    await heidi_service.authenticate()
+    # Only the ChromaDB connection is opened before serving; the embedding
+    # model, ingestion and Heidi authentication continue in the background.
+    # Installing an index artifact can take minutes, so it is left to the
+    # background too, keeping /health answered while it downloads
+    if not vector_service.index_artifact:
+        if not await run_phase("index", open_index()):
+            raise RuntimeError("Vector service failed to initialize")
+    vector_service.add_corpus_listener(on_corpus_changed)
+    metrics.register_cache("query_embeddings", lambda: vector_service.embedding_cache.stats())
+    metrics.register_cache("search_results", lambda: vector_service.result_cache.stats())
+    metrics.register_cache("heidi_responses", lambda: heidi_service.cache_stats())
+    startup_task = asyncio.create_task(warm_up())
+    reload_task = asyncio.create_task(watch_corpus()) if RELOAD_INTERVAL > 0 else None
     
     logger.info("Application startup complete")
     
@@ -38,6 +167,15 @@ async def lifespan(app: FastAPI):
     
     # Shutdown
     logger.info("Shutting down application...")
+    for task in (startup_task, reload_task):
+        if task is not None and not task.done():
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+    await vector_service.shutdown()
+    await heidi_service.close()
 
 app = FastAPI(
     title="Medical Document Vector Search API",
@@ -54,6 +192,7 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+app.add_middleware(metrics.RequestMetricsMiddleware)
 
 @app.get("/")
 async def root():
@@ -62,11 +201,22 @@ async def root():
 
 @app.get("/health")
 async def health_check():
-    """Health check endpoint"""
-    if vector_service and vector_service.is_initialized():
-        return {"status": "healthy", "message": "Vector service is ready"}
-    else:
-        raise HTTPException(status_code=503, detail="Vector service is not ready")
+    """Liveness: the process is up and serving requests"""
+    return {"status": "healthy", "phases": startup_phases, "admission": admission.stats()}
+
+@app.get("/metrics")
+async def prometheus_metrics():
+    """Prometheus metrics"""
+    return Response(generate_latest(), media_type=CONTENT_TYPE_LATEST)
+
+@app.get("/ready")
+async def readiness_check():
+    """Readiness: 200 once the index is open, the model loaded and ingestion done"""
+    ready = all(startup_phases[name] == "ready" for name in READY_PHASES)
+    body = {"status": "ready" if ready else "starting", "phases": startup_phases}
+    if not ready:
+        return JSONResponse(status_code=503, content=body)
+    return body
 
 @app.post("/vector/search", response_model=SearchResponse)
 async def search_documents(request: SearchRequest):
@@ -77,26 +227,73 @@ async def search_documents(request: SearchRequest):
     try:
         results = await vector_service.search(
             query=request.query,
-            n_results=request.n_results
+            n_results=request.n_results,
+            sources=request.sources,
+            mode=request.mode
         )
         return SearchResponse(results=results)
     except Exception as e:
         logger.error(f"Search error: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Search failed: {str(e)}")
 
-@app.post("/vector/process-pdfs")
+@app.post("/vector/search/batch", response_model=BatchSearchResponse)
+async def search_documents_batch(request: BatchSearchRequest):
+    """Run several vector searches with one batched encode and one query per collection"""
+    if not vector_service or not vector_service.is_initialized():
+        raise HTTPException(status_code=503, detail="Vector service is not ready")
+    
+    try:
+        results = await vector_service.search_many(
+            queries=request.queries,
+            n_results=request.n_results,
+            sources=request.sources,
+            mode=request.mode
+        )
+        return BatchSearchResponse(results=results)
+    except Exception as e:
+        logger.error(f"Batch search error: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Batch search failed: {str(e)}")
+
+@app.post("/vector/process-pdfs", response_model=IngestJobStatus, status_code=202)
 async def process_pdfs():
-    """Manually trigger PDF processing"""
-    if not vector_service:
+    """Start PDF processing in the background; poll /vector/process-pdfs/status"""
+    if not vector_service or not vector_service.is_initialized():
         raise HTTPException(status_code=503, detail="Vector service is not ready")
+    if vector_service.read_only:
+        raise HTTPException(status_code=409, detail="This worker is read-only; ingest with `python -m backend.ingest`")
     
     try:
-        result = await vector_service.process_pdfs()
-        return result
+        return vector_service.start_ingest_job()
     except Exception as e:
         logger.error(f"PDF processing error: {str(e)}")
         raise HTTPException(status_code=500, detail=f"PDF processing failed: {str(e)}")
 
+@app.get("/vector/process-pdfs/status", response_model=IngestJobStatus)
+async def process_pdfs_status():
+    """Status of the most recent PDF processing job"""
+    if not vector_service:
+        raise HTTPException(status_code=503, detail="Vector service is not ready")
+    
+    job = vector_service.get_ingest_job()
+    if job is None:
+        raise HTTPException(status_code=404, detail="No PDF processing job has been started")
+    return job
+
+@app.post("/vector/migrate-unified")
+async def migrate_unified(delete_source: bool = False):
+    """Copy existing per-PDF collections into the unified collection"""
+    if not vector_service or not vector_service.is_initialized():
+        raise HTTPException(status_code=503, detail="Vector service is not ready")
+    if vector_service.read_only:
+        raise HTTPException(status_code=409, detail="This worker is read-only")
+    
+    try:
+        result = await vector_service.migrate_to_unified(delete_source=delete_source)
+        return result
+    except Exception as e:
+        logger.error(f"Migration error: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Migration failed: {str(e)}")
+
 @app.get("/vector/collections")
 async def list_collections():
     """List all available collections"""
@@ -110,6 +307,124 @@ async def list_collections():
         logger.error(f"Error listing collections: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Failed to list collections: {str(e)}")
 
+@app.get("/vector/cache/stats")
+async def cache_stats():
+    """Hit/miss/eviction counters for the vector service caches"""
+    if not vector_service:
+        raise HTTPException(status_code=503, detail="Vector service is not ready")
+    
+    return vector_service.cache_stats()
+
+@app.post("/vector/cache/clear")
+async def clear_cache():
+    """Drop all cached query embeddings and search results"""
+    if not vector_service:
+        raise HTTPException(status_code=503, detail="Vector service is not ready")
+    
+    vector_service.clear_caches()
+    return {"message": "Vector caches cleared"}
+
+@app.get("/heidi/cache/stats")
+async def heidi_cache_stats():
+    """Counters for the persisted Heidi extraction/summary cache"""
+    if not heidi_service:
+        raise HTTPException(status_code=503, detail="Heidi service is not ready")
+    
+    return heidi_service.cache_stats()
+
+@app.post("/heidi/cache/purge")
+async def purge_heidi_cache(kind: Optional[str] = None):
+    """Delete cached Heidi answers (optionally only kind=extraction or kind=summary)"""
+    if not heidi_service:
+        raise HTTPException(status_code=503, detail="Heidi service is not ready")
+    
+    try:
+        removed = await heidi_service.purge_cache(kind)
+        return {"message": f"Removed {removed} cached Heidi responses", "removed": removed}
+    except Exception as e:
+        logger.error(f"Heidi cache purge error: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Cache purge failed: {str(e)}")
+
+async def _extract_drugs_timed(content: str, processing_steps: List[str]) -> List[str]:
+    """Extraction stage with its own timeout; times out as HTTP 504"""
+    processing_steps.append("Extracting drug names from medical text using Heidi AI")
+    started = time.perf_counter()
+    try:
+        with metrics.stage("extract", mode=heidi_service.extraction_mode):
+            extracted_drugs = await asyncio.wait_for(heidi_service.extract_drugs(content), EXTRACT_TIMEOUT)
+    except asyncio.TimeoutError:
+        raise HTTPException(status_code=504, detail=f"Drug extraction timed out after {EXTRACT_TIMEOUT:.0f}s")
+    processing_steps.append(f"Extracted {len(extracted_drugs)} drugs: {', '.join(extracted_drugs) if extracted_drugs else 'None'}")
+    processing_steps.append(f"Drug extraction took {(time.perf_counter() - started) * 1000:.0f} ms")
+    return extracted_drugs
+
+async def _retrieve_drug_context(extracted_drugs: List[str],
+                                 processing_steps: List[str]) -> Dict[str, List[SearchResult]]:
+    """Vector search for context chunks about each extracted drug, keyed by drug.
+    
+    Drugs are grouped into batches of SEARCH_BATCH_SIZE (one batched encode
+    and one query per collection each); up to SEARCH_CONCURRENCY batches run
+    at once, and a batch that exceeds SEARCH_TIMEOUT is skipped without
+    holding up the others.
+    """
+    results_by_drug: Dict[str, List[SearchResult]] = {}
+    if not extracted_drugs:
+        return results_by_drug
+    
+    processing_steps.append("Searching vector database for drug-related information")
+    started = time.perf_counter()
+    semaphore = asyncio.Semaphore(SEARCH_CONCURRENCY)
+    batches = [
+        extracted_drugs[i:i + SEARCH_BATCH_SIZE]
+        for i in range(0, len(extracted_drugs), SEARCH_BATCH_SIZE)
+    ]
+    
+    async def search_batch(drugs: List[str]) -> List[List[SearchResult]]:
+        search_queries = [
+            f"{drug} antibiotic medication dosage indication contraindication allergy"
+            for drug in drugs
+        ]
+        async with semaphore:
+            return await asyncio.wait_for(
+                vector_service.search_many(
+                    queries=search_queries,
+                    n_results=3,  # Get 3 results per drug
+                    mode=SEARCH_MODE,
+                    lexical_queries=drugs  # BM25 matches on the drug name itself
+                ),
+                SEARCH_TIMEOUT
+            )
+    
+    with metrics.stage("search", drugs=len(extracted_drugs)):
+        batch_outcomes = await asyncio.gather(
+            *(search_batch(drugs) for drugs in batches),
+            return_exceptions=True
+        )
+    
+    for drugs, outcome in zip(batches, batch_outcomes):
+        if isinstance(outcome, BaseException):
+            reason = "timed out" if isinstance(outcome, asyncio.TimeoutError) else str(outcome)
+            logger.warning(f"Vector search failed for drugs {', '.join(drugs)}: {reason}")
+            processing_steps.append(f"Vector search failed for {', '.join(drugs)}: {reason}")
+            continue
+        for drug, results in zip(drugs, outcome):
+            results_by_drug[drug] = results
+            processing_steps.append(f"Found {len(results)} context chunks for {drug}")
+    
+    processing_steps.append(f"Vector search took {(time.perf_counter() - started) * 1000:.0f} ms")
+    return results_by_drug
+
+def _pack_drug_context(results_by_drug: Dict[str, List[SearchResult]], processing_steps: List[str]) -> List[str]:
+    """Deduplicated, merged context chunks within CONTEXT_TOKEN_BUDGET"""
+    with metrics.stage("pack"):
+        context_chunks = pack_context(results_by_drug, CONTEXT_TOKEN_BUDGET)
+    total = sum(len(results) for results in results_by_drug.values())
+    processing_steps.append(
+        f"Packed {total} search results into {len(context_chunks)} context chunks "
+        f"(budget ~{CONTEXT_TOKEN_BUDGET} tokens)"
+    )
+    return context_chunks
+
 @app.post("/ask-heidi", response_model=HeidiResponse)
 async def ask_heidi_endpoint(request: HeidiRequest):
     """
@@ -127,37 +442,53 @@ async def ask_heidi_endpoint(request: HeidiRequest):
     if not heidi_service:
         raise HTTPException(status_code=503, detail="Heidi service is not ready")
     
+    if not COALESCE:
+        return await _admitted_pipeline(request.content)
+    # Whitespace differences do not change the answer
+    note_key = " ".join(request.content.split())
+    return await ask_heidi_calls.run(note_key, lambda: _admitted_pipeline(request.content))
+
+def _overloaded(e: Overloaded) -> HTTPException:
+    return HTTPException(status_code=e.status_code, detail=e.detail, headers={"Retry-After": str(int(e.retry_after))})
+
+async def _admitted_pipeline(content: str) -> HeidiResponse:
+    """Run the /ask-heidi pipeline once a slot is free; sheds as HTTP 429/503"""
+    try:
+        await admission.acquire()
+    except Overloaded as e:
+        raise _overloaded(e)
+    try:
+        return await _ask_heidi_pipeline(content)
+    finally:
+        admission.release()
+
+async def _ask_heidi_pipeline(content: str) -> HeidiResponse:
     try:
         processing_steps = []
         
         # Step 1: Extract drug names using Heidi
-        processing_steps.append("Extracting drug names from medical text using Heidi AI")
-        extracted_drugs = await heidi_service.extract_drugs(request.content)
-        processing_steps.append(f"Extracted {len(extracted_drugs)} drugs: {', '.join(extracted_drugs) if extracted_drugs else 'None'}")
+        extracted_drugs = await _extract_drugs_timed(content, processing_steps)
         
         # Step 2: Vector search for drug-related information
-        vector_results = []
-        if extracted_drugs:
-            processing_steps.append("Searching vector database for drug-related information")
-            
-            # Create search queries for each drug
-            for drug in extracted_drugs:
-                try:
-                    search_query = f"{drug} antibiotic medication dosage indication contraindication allergy"
-                    results = await vector_service.search(
-                        query=search_query,
-                        n_results=3  # Get 3 results per drug
-                    )
-                    vector_results.extend(results)
-                    processing_steps.append(f"Found {len(results)} context chunks for {drug}")
-                except Exception as e:
-                    logger.warning(f"Vector search failed for drug {drug}: {str(e)}")
+        results_by_drug = await _retrieve_drug_context(extracted_drugs, processing_steps)
+        vector_results = [result for results in results_by_drug.values() for result in results]
         
         # Step 3: Create final summary using Heidi with context
+        context_chunks = _pack_drug_context(results_by_drug, processing_steps)
         processing_steps.append("Generating final drug summary with context using Heidi AI")
-        context_chunks = [result.content for result in vector_results[:10]]  # Limit to top 10 chunks
-        final_summary = await heidi_service.create_drug_summary(extracted_drugs, context_chunks)
-        processing_steps.append("Summary generation completed")
+        started = time.perf_counter()
+        try:
+            with metrics.stage("summary", chunks=len(context_chunks)):
+                final_summary = await asyncio.wait_for(
+                    heidi_service.create_drug_summary(extracted_drugs, context_chunks),
+                    SUMMARY_TIMEOUT
+                )
+            processing_steps.append("Summary generation completed")
+        except asyncio.TimeoutError:
+            logger.warning(f"Summary generation timed out after {SUMMARY_TIMEOUT:.0f}s")
+            final_summary = None
+            processing_steps.append(f"Summary generation timed out after {SUMMARY_TIMEOUT:.0f}s")
+        processing_steps.append(f"Summary generation took {(time.perf_counter() - started) * 1000:.0f} ms")
         
         return HeidiResponse(
             message="Medical text processed successfully with Heidi AI and vector search",
@@ -167,6 +498,112 @@ async def ask_heidi_endpoint(request: HeidiRequest):
             processing_steps=processing_steps
         )
         
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Ask Heidi endpoint error: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Processing failed: {str(e)}")
+
+def _sse_event(event: str, data) -> str:
+    """Format one Server-Sent Event"""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+class _AdmittedStreamingResponse(StreamingResponse):
+    """StreamingResponse that calls ``release`` when the response ends.
+
+    Runs even if the body generator never starts (e.g. the client
+    disconnected first), so the admission slot cannot leak.
+    """
+    
+    def __init__(self, *args, release, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.release = release
+    
+    async def __call__(self, scope, receive, send) -> None:
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            self.release()
+
+@app.post("/ask-heidi/stream")
+async def ask_heidi_stream_endpoint(request: HeidiRequest):
+    """
+    Streaming variant of /ask-heidi using Server-Sent Events
+    
+    Events, in order:
+    - drugs: {"extracted_drugs": [...]}
+    - context: {"vector_context": [...]} (top 5 search results)
+    - summary: {"text": "..."} one event per upstream token chunk
+    - done: {"processing_steps": [...]}
+    - error: {"detail": "..."} instead of done if processing fails part way,
+      including an upstream stream cut off mid-summary
+    """
+    if not vector_service or not vector_service.is_initialized():
+        raise HTTPException(status_code=503, detail="Vector service is not ready")
+    
+    if not heidi_service:
+        raise HTTPException(status_code=503, detail="Heidi service is not ready")
+    
+    # Admit before the response starts so a shed request gets a real status code
+    try:
+        await admission.acquire()
+    except Overloaded as e:
+        raise _overloaded(e)
+    
+    # Both the generator and the response release; whichever ends first wins
+    released = False
+    
+    def release_slot() -> None:
+        nonlocal released
+        if not released:
+            released = True
+            admission.release()
+    
+    async def event_stream():
+        processing_steps = []
+        try:
+            extracted_drugs = await _extract_drugs_timed(request.content, processing_steps)
+            yield _sse_event("drugs", {"extracted_drugs": extracted_drugs})
+            
+            results_by_drug = await _retrieve_drug_context(extracted_drugs, processing_steps)
+            vector_results = [result for results in results_by_drug.values() for result in results]
+            yield _sse_event("context", {
+                "vector_context": [result.model_dump() for result in vector_results[:5]]
+            })
+            
+            context_chunks = _pack_drug_context(results_by_drug, processing_steps)
+            processing_steps.append("Generating final drug summary with context using Heidi AI")
+            started = time.perf_counter()
+            deadline = started + SUMMARY_TIMEOUT
+            summary = heidi_service.stream_drug_summary(extracted_drugs, context_chunks)
+            try:
+                while True:
+                    try:
+                        text = await asyncio.wait_for(summary.__anext__(), max(deadline - time.perf_counter(), 0))
+                    except StopAsyncIteration:
+                        processing_steps.append("Summary generation completed")
+                        break
+                    yield _sse_event("summary", {"text": text})
+            except asyncio.TimeoutError:
+                processing_steps.append(f"Summary generation timed out after {SUMMARY_TIMEOUT:.0f}s")
+            finally:
+                await summary.aclose()
+            summary_seconds = time.perf_counter() - started
+            metrics.ASK_HEIDI_STAGE_SECONDS.labels(stage="summary").observe(summary_seconds)
+            processing_steps.append(f"Summary generation took {summary_seconds * 1000:.0f} ms")
+            
+            yield _sse_event("done", {"processing_steps": processing_steps})
+        except HTTPException as e:
+            yield _sse_event("error", {"detail": e.detail})
+        except Exception as e:
+            logger.error(f"Ask Heidi stream error: {str(e)}")
+            yield _sse_event("error", {"detail": f"Processing failed: {str(e)}"})
+        finally:
+            release_slot()
+    
+    return _AdmittedStreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        release=release_slot
+    )
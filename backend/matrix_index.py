@@ -0,0 +1,265 @@
+import os
+import json
+import shutil
+import logging
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# hnswlib ships with chromadb (chroma-hnswlib); without it large indexes are
+# searched exactly, which is slower but returns the same results
+try:
+    import hnswlib
+except ImportError:
+    hnswlib = None
+
+FORMAT_VERSION = 1
+BLOCK_ROWS = 16384
+
+
+class MatrixChunk(NamedTuple):
+    """A chunk as stored in the matrix index"""
+    chunk_id: str
+    collection: str
+    content: str
+    metadata: Dict[str, Any]
+
+
+class MatrixIndex:
+    """Read-only, memory-mapped matrix of chunk embeddings.
+
+    ``export`` writes a directory holding the embeddings as one contiguous
+    float32 or int8 matrix (``embeddings.npy``, plus per-row scales for
+    int8), their squared norms, the chunk texts as one UTF-8 blob with an
+    offset table, and the chunk IDs and metadata. ``open`` memory-maps the
+    arrays, so every process serving the same directory shares one
+    page-cached copy.
+
+    Search is exact squared L2 distance (ChromaDB's default space) with
+    argpartition top-k. Indexes exported with at least ``hnsw_threshold``
+    chunks also get an HNSW graph, used for unfiltered queries.
+    """
+
+    def __init__(self, directory: Path, header: Dict[str, Any]):
+        self.directory = Path(directory)
+        self.header = header
+        self.generation: int = header["generation"]
+        self.embedding_tag: str = header["embedding"]
+        self.dtype: str = header["dtype"]
+        self.count: int = header["count"]
+        self.dim: int = header["dim"]
+        self.hnsw_ef = 128
+
+        with open(self.directory / "chunks.json", "r", encoding="utf-8") as f:
+            chunks = json.load(f)
+        self._ids: List[str] = [chunk[0] for chunk in chunks]
+        self._collections: List[str] = [chunk[1] for chunk in chunks]
+        self._metadatas: List[Dict[str, Any]] = [chunk[2] for chunk in chunks]
+        self._rows = {chunk_id: row for row, chunk_id in enumerate(self._ids)}
+        self._sources = np.array([metadata.get("source", "Unknown") for metadata in self._metadatas], dtype=object)
+
+        self._embeddings = self._scales = self._norms = self._texts = self._offsets = None
+        if self.count:
+            self._embeddings = np.load(self.directory / "embeddings.npy", mmap_mode="r")
+            self._norms = np.load(self.directory / "norms.npy", mmap_mode="r")
+            self._offsets = np.load(self.directory / "offsets.npy", mmap_mode="r")
+            self._texts = np.memmap(self.directory / "texts.bin", dtype=np.uint8, mode="r")
+            if self.dtype == "int8":
+                self._scales = np.load(self.directory / "scales.npy", mmap_mode="r")
+
+        self._hnsw = None
+        hnsw_path = self.directory / "hnsw.bin"
+        if header.get("hnsw") and hnswlib is not None and hnsw_path.exists():
+            self._hnsw = hnswlib.Index(space="l2", dim=self.dim)
+            self._hnsw.load_index(str(hnsw_path), max_elements=self.count)
+            self._hnsw.set_num_threads(1)
+
+    @classmethod
+    def open(cls, directory: Path, generation: Optional[int] = None) -> Optional["MatrixIndex"]:
+        """Open an exported index, or return None if there is none (or it is unreadable).
+        
+        With ``generation``, an index exported from another generation is
+        skipped after reading only its header.
+        """
+        directory = Path(directory)
+        try:
+            with open(directory / "index.json", "r", encoding="utf-8") as f:
+                header = json.load(f)
+            if header.get("version") != FORMAT_VERSION:
+                logger.warning(f"Ignoring matrix index at {directory}: format version {header.get('version')}")
+                return None
+            if generation is not None and header.get("generation") != generation:
+                return None
+            index = cls(directory, header)
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            logger.warning(f"Could not open matrix index at {directory}: {str(e)}")
+            return None
+        logger.info(
+            f"Matrix index opened: {index.count} chunks, {index.dtype}"
+            f"{', HNSW' if index._hnsw is not None else ''} (generation {index.generation})"
+        )
+        return index
+
+    @staticmethod
+    def export(directory: Path,
+               chunks: Iterable[Tuple[str, str, str, Dict[str, Any], Any]],
+               generation: int,
+               embedding_tag: str,
+               dtype: str = "float32",
+               hnsw_threshold: int = 50000) -> int:
+        """Write (chunk_id, collection, content, metadata, embedding) records to ``directory``.
+
+        The index is written next to the target and swapped in with a
+        rename, so readers never see a partial export. Returns the number
+        of chunks written.
+        """
+        if dtype not in ("float32", "int8"):
+            raise ValueError(f"Unknown matrix index dtype: {dtype}")
+        directory = Path(directory)
+        tmp_dir = directory.with_name(directory.name + ".tmp")
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        tmp_dir.mkdir(parents=True)
+
+        records = []
+        rows = []
+        offsets = [0]
+        with open(tmp_dir / "texts.bin", "wb") as texts:
+            for chunk_id, collection, content, metadata, embedding in chunks:
+                data = content.encode("utf-8")
+                texts.write(data)
+                offsets.append(offsets[-1] + len(data))
+                records.append([chunk_id, collection, metadata or {}])
+                rows.append(np.asarray(embedding, dtype=np.float32))
+
+        count = len(records)
+        dim = int(rows[0].shape[0]) if rows else 0
+        matrix = np.vstack(rows) if rows else np.zeros((0, dim), dtype=np.float32)
+        del rows
+
+        if dtype == "int8":
+            # Symmetric per-row quantization; norms are taken from the
+            # dequantized rows so distances stay consistent
+            scales = np.abs(matrix).max(axis=1) / 127.0
+            scales[scales == 0] = 1.0
+            quantized = np.clip(np.rint(matrix / scales[:, None]), -127, 127).astype(np.int8)
+            matrix = quantized.astype(np.float32) * scales[:, None]
+            np.save(tmp_dir / "embeddings.npy", quantized)
+            np.save(tmp_dir / "scales.npy", scales.astype(np.float32))
+        else:
+            np.save(tmp_dir / "embeddings.npy", matrix)
+        np.save(tmp_dir / "norms.npy", np.einsum("ij,ij->i", matrix, matrix).astype(np.float32))
+        np.save(tmp_dir / "offsets.npy", np.asarray(offsets, dtype=np.int64))
+        with open(tmp_dir / "chunks.json", "w", encoding="utf-8") as f:
+            json.dump(records, f)
+
+        use_hnsw = hnswlib is not None and count >= hnsw_threshold
+        if use_hnsw:
+            graph = hnswlib.Index(space="l2", dim=dim)
+            graph.init_index(max_elements=count, ef_construction=200, M=16)
+            graph.add_items(matrix, np.arange(count))
+            graph.save_index(str(tmp_dir / "hnsw.bin"))
+        elif count >= hnsw_threshold:
+            logger.warning("hnswlib is not installed; the matrix index will be searched exactly")
+
+        header = {
+            "version": FORMAT_VERSION,
+            "generation": generation,
+            "embedding": embedding_tag,
+            "dtype": dtype,
+            "count": count,
+            "dim": dim,
+            "hnsw": use_hnsw,
+        }
+        with open(tmp_dir / "index.json", "w", encoding="utf-8") as f:
+            json.dump(header, f, indent=2, sort_keys=True)
+
+        # Processes that still map the old files keep reading them until
+        # they reopen; the directory entries are simply replaced
+        old_dir = directory.with_name(directory.name + ".old")
+        shutil.rmtree(old_dir, ignore_errors=True)
+        if directory.exists():
+            os.replace(directory, old_dir)
+        os.replace(tmp_dir, directory)
+        shutil.rmtree(old_dir, ignore_errors=True)
+
+        logger.info(f"Matrix index exported: {count} chunks, {dtype}{', HNSW' if use_hnsw else ''}")
+        return count
+
+    def __len__(self) -> int:
+        return self.count
+
+    def chunk(self, row: int) -> MatrixChunk:
+        start, end = int(self._offsets[row]), int(self._offsets[row + 1])
+        return MatrixChunk(
+            self._ids[row],
+            self._collections[row],
+            bytes(self._texts[start:end]).decode("utf-8"),
+            self._metadatas[row]
+        )
+
+    def search(self, query_embeddings: np.ndarray, n_results: int,
+               sources: Optional[List[str]] = None) -> List[List[Tuple[MatrixChunk, float]]]:
+        """Nearest chunks for each query as (chunk, squared L2 distance), nearest first"""
+        queries = np.atleast_2d(np.asarray(query_embeddings, dtype=np.float32))
+        if not self.count or n_results <= 0:
+            return [[] for _ in queries]
+
+        if self._hnsw is not None and not sources:
+            k = min(n_results, self.count)
+            self._hnsw.set_ef(max(self.hnsw_ef, k))
+            labels, distances = self._hnsw.knn_query(queries, k=k)
+            return [
+                [(self.chunk(int(row)), float(distance)) for row, distance in zip(labels[i], distances[i])]
+                for i in range(len(queries))
+            ]
+
+        rows = None
+        if sources:
+            rows = np.flatnonzero(np.isin(self._sources, list(sources)))
+            if not len(rows):
+                return [[] for _ in queries]
+        distances = self._distances(queries, rows)
+
+        k = min(n_results, distances.shape[1])
+        if k < distances.shape[1]:
+            top = np.argpartition(distances, k - 1, axis=1)[:, :k]
+        else:
+            top = np.broadcast_to(np.arange(distances.shape[1]), distances.shape)
+        results = []
+        for i in range(len(queries)):
+            candidates = top[i][np.argsort(distances[i, top[i]], kind="stable")]
+            results.append([
+                (self.chunk(int(rows[column] if rows is not None else column)), float(distances[i, column]))
+                for column in candidates
+            ])
+        return results
+
+    def distances(self, query_embedding: np.ndarray, chunk_ids: List[str]) -> Dict[str, float]:
+        """Squared L2 distance from one query to the given stored chunks"""
+        known = [chunk_id for chunk_id in chunk_ids if chunk_id in self._rows]
+        if not known or not self.count:
+            return {}
+        rows = np.asarray([self._rows[chunk_id] for chunk_id in known])
+        distances = self._distances(np.atleast_2d(np.asarray(query_embedding, dtype=np.float32)), rows)[0]
+        return dict(zip(known, distances.tolist()))
+
+    def _distances(self, queries: np.ndarray, rows: Optional[np.ndarray] = None) -> np.ndarray:
+        """(queries x rows) squared L2 distances, computed block by block"""
+        n = self.count if rows is None else len(rows)
+        dots = np.empty((len(queries), n), dtype=np.float32)
+        for start in range(0, n, BLOCK_ROWS):
+            selection = slice(start, min(start + BLOCK_ROWS, n))
+            index = selection if rows is None else rows[selection]
+            block = np.asarray(self._embeddings[index], dtype=np.float32)
+            block_dots = block @ queries.T
+            if self._scales is not None:
+                block_dots *= np.asarray(self._scales[index])[:, None]
+            dots[:, selection] = block_dots.T
+        norms = np.asarray(self._norms if rows is None else self._norms[rows])
+        distances = norms[None, :] - 2 * dots + np.einsum("ij,ij->i", queries, queries)[:, None]
+        return np.maximum(distances, 0.0)
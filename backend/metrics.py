@@ -0,0 +1,185 @@
+import time
+import logging
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator
+
+from prometheus_client import Counter, Gauge, Histogram, REGISTRY
+from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily
+
+logger = logging.getLogger(__name__)
+
+# OpenTelemetry is optional: spans are recorded only when the API package is
+# installed, and exported only when an SDK is configured (for example by
+# running under `opentelemetry-instrument`). Otherwise span() is a no-op.
+try:
+    from opentelemetry import trace as _otel_trace
+    _tracer = _otel_trace.get_tracer("heidi-antibiotic-guide")
+except ImportError:
+    _tracer = None
+
+# Buckets in seconds, from sub-millisecond cache hits to long upstream calls
+FAST_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+SLOW_BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+HTTP_REQUESTS_IN_FLIGHT = Gauge(
+    "http_requests_in_flight", "Requests currently being handled", ["path"]
+)
+HTTP_REQUEST_SECONDS = Histogram(
+    "http_request_duration_seconds", "Request latency by route", ["method", "path", "status"],
+    buckets=SLOW_BUCKETS
+)
+
+EMBEDDING_ENCODE_SECONDS = Histogram(
+    "embedding_encode_seconds", "Time to encode one batch of texts", ["kind"], buckets=FAST_BUCKETS + (5.0, 10.0)
+)
+EMBEDDING_TEXTS = Counter("embedding_texts_total", "Texts encoded", ["kind"])
+VECTOR_COLLECTION_QUERY_SECONDS = Histogram(
+    "vector_collection_query_seconds", "ChromaDB query time per collection", ["collection"], buckets=FAST_BUCKETS
+)
+VECTOR_SEARCH_SECONDS = Histogram(
+    "vector_search_seconds", "VectorService.search_many latency, including cache hits", ["mode"],
+    buckets=FAST_BUCKETS
+)
+
+INGEST_PDF_SECONDS = Histogram(
+    "ingest_pdf_seconds", "Time to process one PDF", ["status"], buckets=SLOW_BUCKETS + (120.0, 300.0)
+)
+INGEST_PDF_CHUNKS_PER_SECOND = Histogram(
+    "ingest_pdf_chunks_per_second", "Chunking and indexing throughput of each re-indexed PDF",
+    buckets=(1, 5, 10, 25, 50, 100, 250, 500, 1000, 2500)
+)
+INGEST_CHUNKS = Counter("ingest_chunks_total", "Chunks produced by re-indexed PDFs")
+INGEST_BYTES = Counter("ingest_bytes_total", "PDF bytes re-indexed")
+
+HEIDI_REQUEST_SECONDS = Histogram(
+    "heidi_request_seconds",
+    "Heidi API latency by phase (auth, session, ask_ai, first_token, stream)",
+    ["phase"],
+    buckets=SLOW_BUCKETS
+)
+HEIDI_RESPONSES = Counter("heidi_responses_total", "Heidi API responses by phase and status", ["phase", "status"])
+
+ASK_HEIDI_STAGE_SECONDS = Histogram(
+    "ask_heidi_stage_seconds", "/ask-heidi latency by pipeline stage", ["stage"], buckets=SLOW_BUCKETS
+)
+
+ADMISSION_IN_FLIGHT = Gauge("admission_in_flight", "Admitted requests currently running", ["pool"])
+ADMISSION_QUEUE_DEPTH = Gauge("admission_queue_depth", "Requests waiting for a slot", ["pool"])
+ADMISSION_SHED = Counter("admission_shed_total", "Requests rejected by admission control", ["pool", "reason"])
+ADMISSION_WAIT_SECONDS = Histogram(
+    "admission_wait_seconds", "Time spent queued before admission", ["pool"],
+    buckets=(0.001, 0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+)
+COALESCED_REQUESTS = Counter(
+    "coalesced_requests_total", "Requests served by joining an identical in-flight computation", ["kind"]
+)
+
+
+class _CacheCollector:
+    """Exports hit/miss/entry counts of registered caches at scrape time"""
+
+    def __init__(self):
+        self.sources: Dict[str, Callable[[], Dict[str, Any]]] = {}
+
+    def collect(self):
+        hits = CounterMetricFamily("cache_hits", "Cache hits", labels=["cache"])
+        misses = CounterMetricFamily("cache_misses", "Cache misses", labels=["cache"])
+        evictions = CounterMetricFamily("cache_evictions", "Cache evictions", labels=["cache"])
+        entries = GaugeMetricFamily("cache_entries", "Entries currently cached", labels=["cache"])
+        hit_rate = GaugeMetricFamily("cache_hit_rate", "Hits / lookups since start", labels=["cache"])
+        for name, stats_fn in list(self.sources.items()):
+            try:
+                stats = stats_fn()
+            except Exception as e:
+                logger.warning(f"Could not read stats of cache '{name}': {str(e)}")
+                continue
+            hits.add_metric([name], stats.get("hits", 0))
+            misses.add_metric([name], stats.get("misses", 0))
+            evictions.add_metric([name], stats.get("evictions", 0))
+            entries.add_metric([name], stats.get("entries", 0))
+            hit_rate.add_metric([name], stats.get("hit_rate", 0.0))
+        return [hits, misses, evictions, entries, hit_rate]
+
+
+_cache_collector = _CacheCollector()
+REGISTRY.register(_cache_collector)
+
+
+def register_cache(name: str, stats_fn: Callable[[], Dict[str, Any]]) -> None:
+    """Export a cache's stats() under ``name``; re-registering a name replaces it"""
+    _cache_collector.sources[name] = stats_fn
+
+
+@contextmanager
+def observe(histogram: Histogram, **labels: str) -> Iterator[None]:
+    """Time the enclosed block into a histogram"""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        (histogram.labels(**labels) if labels else histogram).observe(time.perf_counter() - started)
+
+
+@contextmanager
+def span(name: str, **attributes: Any) -> Iterator[None]:
+    """OpenTelemetry span around the enclosed block, if tracing is available"""
+    if _tracer is None:
+        yield
+        return
+    with _tracer.start_as_current_span(name, attributes=attributes):
+        yield
+
+
+@contextmanager
+def stage(name: str, **attributes: Any) -> Iterator[None]:
+    """One /ask-heidi pipeline stage: stage latency histogram plus a span"""
+    with span(f"ask_heidi.{name}", **attributes), observe(ASK_HEIDI_STAGE_SECONDS, stage=name):
+        yield
+
+
+def _route_path(scope) -> str:
+    """Route template for a request (e.g. /vector/search), keeping label cardinality bounded"""
+    from starlette.routing import Match
+
+    app = scope.get("app")
+    for route in getattr(getattr(app, "router", None), "routes", []):
+        match, _ = route.matches(scope)
+        if match == Match.FULL:
+            return getattr(route, "path", "unmatched")
+    return "unmatched"
+
+
+class RequestMetricsMiddleware:
+    """ASGI middleware recording in-flight requests and latency per route.
+
+    Implemented at the ASGI level so streamed responses count until their
+    last byte is sent.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        path = _route_path(scope)
+        status = "500"
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = str(message["status"])
+            await send(message)
+
+        in_flight = HTTP_REQUESTS_IN_FLIGHT.labels(path=path)
+        in_flight.inc()
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            in_flight.dec()
+            HTTP_REQUEST_SECONDS.labels(method=scope["method"], path=path, status=status).observe(
+                time.perf_counter() - started
+            )
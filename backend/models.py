@@ -1,10 +1,13 @@
 from pydantic import BaseModel, Field
-from typing import List, Dict, Any
+from datetime import datetime
+from typing import List, Dict, Any, Literal, Optional
 
 class SearchRequest(BaseModel):
     """Request model for vector search"""
     query: str = Field(..., description="The search query")
     n_results: int = Field(default=5, ge=1, le=20, description="Number of results to return")
+    sources: Optional[List[str]] = Field(default=None, description="Restrict the search to these source PDF file names")
+    mode: Optional[Literal["vector", "hybrid"]] = Field(default=None, description="Ranking mode; defaults to VECTOR_SEARCH_MODE")
 
 class SearchResult(BaseModel):
     """Individual search result"""
@@ -17,13 +20,34 @@ class SearchResponse(BaseModel):
     """Response model for vector search"""
     results: List[SearchResult] = Field(..., description="List of search results")
 
+class BatchSearchRequest(BaseModel):
+    """Request model for batched vector search"""
+    queries: List[str] = Field(..., min_length=1, max_length=50, description="The search queries")
+    n_results: int = Field(default=5, ge=1, le=20, description="Number of results to return per query")
+    sources: Optional[List[str]] = Field(default=None, description="Restrict the search to these source PDF file names")
+    mode: Optional[Literal["vector", "hybrid"]] = Field(default=None, description="Ranking mode; defaults to VECTOR_SEARCH_MODE")
+
+class BatchSearchResponse(BaseModel):
+    """Response model for batched vector search"""
+    results: List[List[SearchResult]] = Field(..., description="Search results for each query, in request order")
+
 class ProcessingResult(BaseModel):
     """Result of PDF processing operation"""
     message: str = Field(..., description="Processing status message")
     successful: int = Field(..., description="Number of successfully processed files")
     failed: int = Field(default=0, description="Number of failed files")
+    skipped: int = Field(default=0, description="Number of unchanged files skipped")
     details: List[str] = Field(default_factory=list, description="Processing details")
 
+class IngestJobStatus(BaseModel):
+    """Status of a background PDF processing job"""
+    job_id: str = Field(..., description="Identifier of the ingestion job")
+    state: str = Field(..., description="running, completed, failed or cancelled")
+    started_at: datetime = Field(..., description="When the job started")
+    finished_at: Optional[datetime] = Field(default=None, description="When the job finished")
+    result: Optional[ProcessingResult] = Field(default=None, description="Processing result once completed")
+    error: Optional[str] = Field(default=None, description="Error message if the job failed")
+
 class HeidiRequest(BaseModel):
     """Request model for Heidi ask-heidi endpoint"""
     content: str = Field(..., description="Medical notes/text to process")
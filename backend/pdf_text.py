@@ -0,0 +1,42 @@
+import logging
+from pathlib import Path
+from typing import List
+
+import PyPDF2
+
+logger = logging.getLogger(__name__)
+
+# Kept free of heavy imports (torch, chromadb) so process-pool workers
+# started with the "spawn" method only pay for PyPDF2.
+
+def count_pages(pdf_path: Path) -> int:
+    """Number of pages in a PDF file"""
+    pdf_path = Path(pdf_path)
+    try:
+        with open(pdf_path, 'rb') as file:
+            return len(PyPDF2.PdfReader(file).pages)
+    except Exception as e:
+        raise ValueError(f"Failed to read PDF file {pdf_path.name}: {str(e)}")
+
+
+def extract_page_range(pdf_path: Path, start: int, end: int) -> List[str]:
+    """Extract the text of pages [start, end) of a PDF, one string per page"""
+    pdf_path = Path(pdf_path)
+    pages = []
+
+    try:
+        with open(pdf_path, 'rb') as file:
+            pdf_reader = PyPDF2.PdfReader(file)
+
+            for page_num in range(start, min(end, len(pdf_reader.pages))):
+                try:
+                    page_text = pdf_reader.pages[page_num].extract_text()
+                    pages.append(page_text + "\n" if page_text else "")
+                except Exception as e:
+                    logger.warning(f"Error extracting text from page {page_num + 1} of {pdf_path.name}: {str(e)}")
+                    pages.append("")
+
+    except Exception as e:
+        raise ValueError(f"Failed to read PDF file {pdf_path.name}: {str(e)}")
+
+    return pages
@@ -1,49 +1,242 @@
 import os
+import json
+import time
+import uuid
+import hashlib
 import logging
-from typing import List, Dict, Any, Optional
+import functools
+import multiprocessing
+from contextlib import asynccontextmanager
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from datetime import datetime, timezone
+from collections import deque
+from typing import List, Dict, Any, Optional, Iterator, AsyncIterator, Callable, Awaitable, Tuple
 import asyncio
 from pathlib import Path
 
+try:
+    import fcntl
+except ImportError:  # Windows: ingestion is only serialised within one process
+    fcntl = None
+
 import chromadb
-import PyPDF2
-from sentence_transformers import SentenceTransformer
+import numpy as np
 from langchain.text_splitter import RecursiveCharacterTextSplitter
 
-from .models import SearchResult, ProcessingResult
+from .models import SearchResult, ProcessingResult, IngestJobStatus
+from .pdf_text import count_pages, extract_page_range
+from .cache import LRUCache, normalize_query
+from .lexical_index import BM25Index, LexicalDocument
+from .matrix_index import MatrixIndex
+from .index_artifact import install_artifact
+from .embeddings import (
+    EmbeddingBackend, create_embedding_backend, embedding_tag,
+    preload_embedding_backend, preloaded_embedding_backend
+)
+from . import metrics
 
 logger = logging.getLogger(__name__)
 
+class _StreamingSplitter:
+    """Feeds text through a splitter window by window.
+    
+    Once the buffer reaches ``window_chars`` it is split and every chunk but
+    the last is emitted; the last chunk's text starts the next window so
+    overlap is preserved. Documents shorter than the window are chunked
+    exactly as a single split_text() call would.
+    """
+    
+    def __init__(self, splitter, window_chars: int):
+        self.splitter = splitter
+        self.window_chars = window_chars
+        self._buffer: List[str] = []
+        self._size = 0
+    
+    def feed(self, text: str) -> List[str]:
+        self._buffer.append(text)
+        self._size += len(text)
+        if self._size < self.window_chars:
+            return []
+        
+        window = "".join(self._buffer)
+        chunks = self.splitter.split_text(window)
+        tail_start = window.rfind(chunks[-1]) if chunks else -1
+        if len(chunks) < 2 or tail_start <= 0:
+            self._buffer = [window]
+            return []
+        
+        self._buffer = [window[tail_start:]]
+        self._size = len(self._buffer[0])
+        return chunks[:-1]
+    
+    def finish(self) -> List[str]:
+        window = "".join(self._buffer)
+        self._buffer = []
+        self._size = 0
+        return self.splitter.split_text(window) if window.strip() else []
+
 class VectorService:
     """Service for managing vector operations with ChromaDB"""
     
     def __init__(self):
         self.client = None
-        self.embedding_model = None
+        self.embedding_backend: Optional[EmbeddingBackend] = None
         self.text_splitter = None
         self.collections = {}
         self.initialized = False
         
         # Configuration for local development
         self.references_dir = Path("references")
+        self.persist_directory = Path("./chroma_db")
+        self.manifest_path = self.persist_directory / "ingest_manifest.json"
+        
+        # Embedding backend: "sentence-transformers" (PyTorch) or "onnx" (ONNX
+        # Runtime, int8-quantized by default). Collections and the ingestion
+        # manifest record the backend tag so vectors are never mixed.
+        self.embedding_model_name = os.getenv("EMBEDDING_MODEL", "sentence-transformers/all-MiniLM-L6-v2")
+        self.embedding_backend_name = os.getenv("EMBEDDING_BACKEND", "sentence-transformers")
+        self.embedding_threads = int(os.getenv("EMBEDDING_THREADS", "0"))
+        self.embedding_max_batch_size = int(os.getenv("EMBEDDING_MAX_BATCH_SIZE", "64"))
+        self.embedding_quantize = os.getenv("EMBEDDING_ONNX_QUANTIZE", "true").lower() in ("1", "true", "yes")
+        self.embedding_tag = embedding_tag(
+            self.embedding_backend_name, self.embedding_model_name, self.embedding_quantize
+        )
+        
+        self.chunk_size = 1000
+        self.chunk_overlap = 200
+        self.chunk_separators = ["\n\n", "\n", ". ", " ", ""]
+        
+        # "per_document" keeps one collection per PDF; "unified" stores every
+        # chunk in a single collection and filters by the "source" metadata
+        self.storage_layout = os.getenv("VECTOR_STORAGE_LAYOUT", "per_document")
+        if self.storage_layout not in ("per_document", "unified"):
+            raise ValueError(f"Unknown VECTOR_STORAGE_LAYOUT: {self.storage_layout}")
+        self.unified_collection_name = "unified_chunks"
+        
+        # Blocking work (encoding, ChromaDB calls) runs on a bounded thread
+        # pool; PDF parsing is pure Python and runs in a process pool so it
+        # does not hold the event loop's GIL
+        self.query_workers = int(os.getenv("VECTOR_QUERY_WORKERS", "4"))
+        self.ingest_workers = int(os.getenv("VECTOR_INGEST_WORKERS", "2"))
+        
+        # Ingest pipeline: PDFs processed at once, pages per extraction task,
+        # and chunks per embedding batch (encoding overlaps the previous write)
+        self.ingest_concurrency = int(os.getenv("VECTOR_INGEST_CONCURRENCY", "2"))
+        self.pages_per_task = int(os.getenv("VECTOR_PAGES_PER_TASK", "16"))
+        self.embed_batch_size = int(os.getenv("VECTOR_EMBED_BATCH_SIZE", "256"))
+        
+        # Memory bounds for streaming ingestion: characters of page text
+        # buffered before splitting, and page-range tasks extracted ahead
+        self.split_window_chars = int(os.getenv("VECTOR_SPLIT_WINDOW_CHARS", "200000"))
+        self.extract_lookahead = int(os.getenv("VECTOR_EXTRACT_LOOKAHEAD", str(2 * self.ingest_workers)))
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._pdf_executor: Optional[ProcessPoolExecutor] = None
+        self._ingest_lock = asyncio.Lock()
         
-    async def initialize(self) -> None:
-        """Initialize ChromaDB connection and embedding model"""
+        # Several processes can share one index directory: writes (ingestion,
+        # migration, matrix export) hold an exclusive lock on ingest.lock, and
+        # a read-only process never writes but picks up other processes'
+        # ingests through reload()
+        self.read_only = os.getenv("VECTOR_READ_ONLY", "false").lower() in ("1", "true", "yes")
+        self.ingest_lock_path = self.persist_directory / "ingest.lock"
+        
+        # Prebuilt index (python -m backend.ingest --artifact) to download,
+        # verify and unpack into persist_directory at startup; the process
+        # then serves it read-only
+        self.index_artifact = os.getenv("VECTOR_INDEX_ARTIFACT") or None
+        self.index_artifact_sha256 = os.getenv("VECTOR_INDEX_ARTIFACT_SHA256") or None
+        self._ingest_job: Optional[IngestJobStatus] = None
+        self._ingest_task: Optional[asyncio.Task] = None
+        self._model_task: Optional[asyncio.Future] = None
+        
+        # "vector" (default) ranks by embedding distance only; opt-in "hybrid"
+        # fuses the vector ranking with a BM25 ranking over the same chunks
+        # (reciprocal rank fusion), which favours chunks naming the exact drug
+        self.search_mode = os.getenv("VECTOR_SEARCH_MODE", "vector")
+        if self.search_mode not in ("vector", "hybrid"):
+            raise ValueError(f"Unknown VECTOR_SEARCH_MODE: {self.search_mode}")
+        self.hybrid_candidates = int(os.getenv("VECTOR_HYBRID_CANDIDATES", "20"))
+        self.rrf_k = int(os.getenv("VECTOR_RRF_K", "60"))
+        self.lexical_index = BM25Index()
+        self.lexical_generation: Optional[int] = None
+        
+        # Read path: "chroma" queries ChromaDB; "matrix" exports every chunk
+        # embedding after ingestion to a memory-mapped float32/int8 matrix and
+        # searches it with NumPy (HNSW above VECTOR_MATRIX_HNSW_THRESHOLD
+        # chunks). ChromaDB stays the write path and the fallback while the
+        # export is missing or behind the corpus generation.
+        self.read_engine = os.getenv("VECTOR_READ_ENGINE", "chroma")
+        if self.read_engine not in ("chroma", "matrix"):
+            raise ValueError(f"Unknown VECTOR_READ_ENGINE: {self.read_engine}")
+        self.matrix_dtype = os.getenv("VECTOR_MATRIX_DTYPE", "float32")
+        if self.matrix_dtype not in ("float32", "int8"):
+            raise ValueError(f"Unknown VECTOR_MATRIX_DTYPE: {self.matrix_dtype}")
+        self.matrix_hnsw_threshold = int(os.getenv("VECTOR_MATRIX_HNSW_THRESHOLD", "50000"))
+        self.matrix_directory = self.persist_directory / "matrix_index"
+        self.matrix_index: Optional[MatrixIndex] = None
+        
+        # Query text -> embedding, keyed on (model name, normalized query)
+        self.embedding_cache = LRUCache(
+            max_entries=int(os.getenv("VECTOR_EMBEDDING_CACHE_ENTRIES", "4096")),
+            max_bytes=int(float(os.getenv("VECTOR_EMBEDDING_CACHE_MB", "16")) * 1024 * 1024),
+            ttl_seconds=float(os.getenv("VECTOR_EMBEDDING_CACHE_TTL", "0")),
+            size_of=lambda embedding: embedding.nbytes
+        )
+        
+        # (corpus generation, layout, normalized query, n_results, sources) -> results.
+        # The generation is persisted in the ingestion manifest and bumped
+        # whenever ingestion changes the index.
+        self.corpus_generation = 0
+        self.corpus_listeners: List[Callable[[], Awaitable[None]]] = []
+        self.result_cache = LRUCache(
+            max_entries=int(os.getenv("VECTOR_RESULT_CACHE_ENTRIES", "2048")),
+            max_bytes=int(float(os.getenv("VECTOR_RESULT_CACHE_MB", "32")) * 1024 * 1024),
+            ttl_seconds=float(os.getenv("VECTOR_RESULT_CACHE_TTL", "0")),
+            size_of=self._results_size
+        )
+        
+    def use_directories(self, references_dir: Optional[Path] = None,
+                        persist_directory: Optional[Path] = None) -> None:
+        """Point the service at other PDF and index directories (before initialize())"""
+        if references_dir is not None:
+            self.references_dir = Path(references_dir)
+        if persist_directory is not None:
+            self.persist_directory = Path(persist_directory)
+            self.manifest_path = self.persist_directory / "ingest_manifest.json"
+            self.ingest_lock_path = self.persist_directory / "ingest.lock"
+            self.matrix_directory = self.persist_directory / "matrix_index"
+    
+    async def initialize(self, load_model: bool = True) -> None:
+        """Initialize ChromaDB connection and, unless deferred, the embedding model
+        
+        With ``load_model=False`` only the cheap parts run; the model is then
+        loaded by ensure_model(), either in the background or on first use.
+        """
         try:
+            self._executor = ThreadPoolExecutor(
+                max_workers=self.query_workers,
+                thread_name_prefix="vector-worker"
+            )
+            
+            if self.index_artifact:
+                await self._run(self._install_index_artifact)
+            
             # Initialize ChromaDB client for local development
-            self.client = chromadb.PersistentClient(path="./chroma_db")
+            self.client = await self._run(chromadb.PersistentClient, path=str(self.persist_directory))
             logger.info("Connected to local ChromaDB")
             
-            # Initialize embedding model
-            logger.info("Loading embedding model...")
-            self.embedding_model = SentenceTransformer('sentence-transformers/all-MiniLM-L6-v2')
-            logger.info("Embedding model loaded successfully")
+            manifest = await self._run(self._load_manifest)
+            self.corpus_generation = manifest.get("generation", 0)
+            
+            if self.read_engine == "matrix":
+                self.matrix_index = await self._run(MatrixIndex.open, self.matrix_directory)
             
             # Initialize text splitter
             self.text_splitter = RecursiveCharacterTextSplitter(
-                chunk_size=1000,
-                chunk_overlap=200,
+                chunk_size=self.chunk_size,
+                chunk_overlap=self.chunk_overlap,
                 length_function=len,
-                separators=["\n\n", "\n", ". ", " ", ""]
+                separators=self.chunk_separators
             )
             
             self.initialized = True
@@ -52,18 +245,341 @@ class VectorService:
         except Exception as e:
             logger.error(f"Failed to initialize vector service: {str(e)}")
             raise
+        
+        if load_model:
+            await self.ensure_model()
+    
+    def _install_index_artifact(self) -> None:
+        artifact = install_artifact(self.index_artifact, self.persist_directory, self.index_artifact_sha256)
+        if artifact.get("embedding") != self.embedding_tag:
+            raise RuntimeError(
+                f"Index artifact was built with '{artifact.get('embedding')}', not '{self.embedding_tag}'"
+            )
+        layout = artifact.get("storage_layout", self.storage_layout)
+        if layout != self.storage_layout:
+            logger.info(f"Using the index artifact's storage layout: {layout}")
+            self.storage_layout = layout
+        self.read_only = True
+    
+    async def ensure_model(self) -> EmbeddingBackend:
+        """Return the embedding backend, loading it on first use
+        
+        Concurrent callers share a single load; a failed load is retried by
+        the next caller.
+        """
+        if self.embedding_backend is not None:
+            return self.embedding_backend
+        
+        if self._model_task is None or (self._model_task.done() and self._model_task.exception()):
+            self._model_task = asyncio.ensure_future(self._run(self._load_model))
+        await asyncio.shield(self._model_task)
+        return self.embedding_backend
+    
+    def _create_backend(self) -> EmbeddingBackend:
+        return create_embedding_backend(
+            self.embedding_backend_name,
+            self.embedding_model_name,
+            threads=self.embedding_threads,
+            max_batch_size=self.embedding_max_batch_size,
+            quantize=self.embedding_quantize,
+            export_dir=os.getenv("EMBEDDING_ONNX_DIR")
+        )
+    
+    def preload_model(self) -> None:
+        """Load the embedding model in a parent process before it forks workers.
+        
+        No inference runs here: thread pools started before a fork do not
+        survive it, so each worker still does its own warm-up encode. ONNX
+        Runtime sessions are not fork-safe and are loaded per worker instead.
+        """
+        if self.embedding_backend_name == "onnx":
+            logger.info("Not preloading the ONNX backend; each worker loads its own session")
+            return
+        started = time.perf_counter()
+        preload_embedding_backend(self._create_backend())
+        logger.info(f"Embedding model preloaded ({self.embedding_tag}) in {time.perf_counter() - started:.1f}s")
+    
+    def _load_model(self) -> None:
+        backend = preloaded_embedding_backend(self.embedding_tag)
+        started = time.perf_counter()
+        if backend is None:
+            logger.info("Loading embedding model...")
+            backend = self._create_backend()
+        # Warm-up encode so the first real query does not pay for lazy
+        # kernel initialisation and allocator growth
+        backend.encode(["warmup"])
+        self.embedding_backend = backend
+        logger.info(f"Embedding model loaded successfully ({self.embedding_tag}) in {time.perf_counter() - started:.1f}s")
     
     def is_initialized(self) -> bool:
         """Check if the service is properly initialized"""
         return self.initialized and self.client is not None
     
-    async def process_pdfs(self) -> ProcessingResult:
-        """Process all PDFs in the references directory"""
+    async def shutdown(self) -> None:
+        """Cancel background ingestion and release the worker pools"""
+        if self._ingest_task and not self._ingest_task.done():
+            self._ingest_task.cancel()
+        if self._pdf_executor is not None:
+            self._pdf_executor.shutdown(wait=False, cancel_futures=True)
+            self._pdf_executor = None
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+    
+    async def _run(self, func, *args, **kwargs):
+        """Run a blocking callable on the bounded worker thread pool"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, functools.partial(func, *args, **kwargs))
+    
+    def _get_pdf_executor(self) -> ProcessPoolExecutor:
+        """Lazily start the PDF parsing process pool"""
+        if self._pdf_executor is None:
+            self._pdf_executor = ProcessPoolExecutor(
+                max_workers=self.ingest_workers,
+                mp_context=multiprocessing.get_context("spawn")
+            )
+        return self._pdf_executor
+    
+    def start_ingest_job(self) -> IngestJobStatus:
+        """Start process_pdfs() in the background unless a job is already running"""
+        if not self.is_initialized():
+            raise RuntimeError("Vector service not initialized")
+        
+        if self._ingest_task and not self._ingest_task.done():
+            return self._ingest_job
+        
+        self._ingest_job = IngestJobStatus(
+            job_id=uuid.uuid4().hex,
+            state="running",
+            started_at=datetime.now(timezone.utc)
+        )
+        self._ingest_task = asyncio.create_task(self._run_ingest_job(self._ingest_job))
+        return self._ingest_job
+    
+    def get_ingest_job(self) -> Optional[IngestJobStatus]:
+        """Status of the most recent background ingestion job"""
+        return self._ingest_job
+    
+    async def _run_ingest_job(self, job: IngestJobStatus) -> None:
+        try:
+            job.result = await self.process_pdfs()
+            job.state = "completed"
+        except asyncio.CancelledError:
+            job.state = "cancelled"
+            raise
+        except Exception as e:
+            logger.error(f"Background PDF processing failed: {str(e)}")
+            job.state = "failed"
+            job.error = str(e)
+        finally:
+            job.finished_at = datetime.now(timezone.utc)
+    
+    async def process_pdfs(self, on_progress: Optional[Callable[[Path, str, float, int], None]] = None
+                           ) -> ProcessingResult:
+        """Process all PDFs in the references directory
+        
+        ``on_progress`` is called as each PDF finishes with (path, status,
+        seconds, chunk count); status is "unchanged", "failed" or how the
+        PDF was indexed.
+        """
         if not self.is_initialized():
             raise RuntimeError("Vector service not initialized")
+        if self.read_only:
+            raise RuntimeError("Vector service is read-only; ingest with `python -m backend.ingest`")
+        
+        generation = self.corpus_generation
+        async with self._write_lock():
+            result = await self._process_pdfs_locked(on_progress)
         
+        if self.corpus_generation != generation:
+            await self._notify_corpus_listeners()
+        return result
+    
+    async def reload(self) -> bool:
+        """Pick up an index another process (the ingest CLI, another worker) changed.
+        
+        Reads the manifest's corpus generation; if it moved, result caches
+        are dropped, the BM25 index is rebuilt and the matrix index reopened.
+        Returns True if the corpus changed.
+        """
+        if not self.is_initialized():
+            raise RuntimeError("Vector service not initialized")
+        
+        generation = self.corpus_generation
+        async with self._ingest_lock:
+            manifest = await self._run(self._load_manifest)
+            self._sync_generation(manifest)
+            if self.lexical_generation != self.corpus_generation:
+                await self._run(self._refresh_lexical_index)
+            # Checked on its own: the writer saves the manifest before it
+            # exports, so an earlier reload may have opened the previous export.
+            # Only the writer exports, under the cross-process write lock
+            if self.read_engine == "matrix" and self._current_matrix_index() is None:
+                await self._run(self._refresh_matrix_index, export=False)
+        
+        if self.corpus_generation != generation:
+            await self._notify_corpus_listeners()
+            return True
+        return False
+    
+    @asynccontextmanager
+    async def _write_lock(self):
+        """Exclusive index write access, within this process and across processes"""
+        async with self._ingest_lock:
+            future = asyncio.ensure_future(self._run(self._acquire_file_lock))
+            try:
+                lock_file = await asyncio.shield(future)
+            except asyncio.CancelledError:
+                # The thread may still get the lock; release it when it does
+                future.add_done_callback(
+                    lambda f: None if f.cancelled() or f.exception() else self._release_file_lock(f.result())
+                )
+                raise
+            try:
+                yield
+            finally:
+                self._release_file_lock(lock_file)
+    
+    def _acquire_file_lock(self):
+        self.ingest_lock_path.parent.mkdir(parents=True, exist_ok=True)
+        lock_file = open(self.ingest_lock_path, "a+")
+        if fcntl is None:
+            return lock_file
+        try:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            logger.info("Another process is writing the index; waiting for it to finish")
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+        return lock_file
+    
+    @staticmethod
+    def _release_file_lock(lock_file) -> None:
+        if fcntl is not None:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+        lock_file.close()
+    
+    def _sync_generation(self, manifest: Dict[str, Any]) -> None:
+        """Adopt a corpus generation written by another process"""
+        generation = manifest.get("generation", 0)
+        if generation != self.corpus_generation:
+            logger.info(f"Corpus generation changed on disk: {self.corpus_generation} -> {generation}")
+            self.corpus_generation = generation
+            self.result_cache.clear()
+    
+    def add_corpus_listener(self, listener: Callable[[], Awaitable[None]]) -> None:
+        """Register a coroutine function called after ingestion changes the corpus"""
+        self.corpus_listeners.append(listener)
+    
+    async def _notify_corpus_listeners(self) -> None:
+        for listener in self.corpus_listeners:
+            try:
+                await listener()
+            except Exception as e:
+                logger.error(f"Corpus listener failed: {str(e)}")
+    
+    def iter_documents(self, batch_size: int = 500) -> Iterator[str]:
+        """Yield the text of every stored chunk, reading the index in batches"""
+        for _, _, document, _ in self.iter_chunks(batch_size, include_metadata=False):
+            yield document
+    
+    def iter_chunks(self, batch_size: int = 500,
+                    include_metadata: bool = True) -> Iterator[Tuple[str, str, str, Dict[str, Any]]]:
+        """Yield (chunk ID, collection name, text, metadata) for every stored chunk"""
+        include = ["documents", "metadatas"] if include_metadata else ["documents"]
+        for collection in self._stored_collections():
+            total = collection.count()
+            for offset in range(0, total, batch_size):
+                batch = collection.get(include=include, limit=batch_size, offset=offset)
+                metadatas = batch.get("metadatas") or [{}] * len(batch["ids"])
+                for chunk_id, document, metadata in zip(batch["ids"], batch["documents"], metadatas):
+                    yield chunk_id, collection.name, document, metadata
+    
+    def _iter_embedded_chunks(self, batch_size: int = 500) -> Iterator[Tuple[str, str, str, Dict[str, Any], Any]]:
+        """Like iter_chunks, with each chunk's stored embedding; skips collections of another model"""
+        for collection in self._stored_collections():
+            if self._collection_tag(collection.metadata) != self.embedding_tag:
+                continue
+            total = collection.count()
+            for offset in range(0, total, batch_size):
+                batch = collection.get(
+                    include=["documents", "metadatas", "embeddings"], limit=batch_size, offset=offset
+                )
+                for record in zip(batch["ids"], batch["documents"], batch["metadatas"], batch["embeddings"]):
+                    chunk_id, document, metadata, embedding = record
+                    yield chunk_id, collection.name, document, metadata, embedding
+    
+    def _stored_collections(self) -> list:
+        """Collections holding the chunks of the configured storage layout"""
+        if self.storage_layout == "unified":
+            collection = self._get_existing_collection(self.unified_collection_name)
+            return [collection] if collection is not None else []
+        return [
+            self.client.get_collection(info.name)
+            for info in self.client.list_collections()
+            if info.name != self.unified_collection_name
+        ]
+    
+    async def _refresh_derived_indexes(self) -> None:
+        """Bring the BM25 and matrix indexes up to the current corpus generation"""
+        await self._run(self._refresh_lexical_index)
+        await self._run(self._refresh_matrix_index)
+    
+    def _refresh_lexical_index(self) -> None:
+        """Rebuild the BM25 index from the stored chunks if the corpus changed"""
+        if self.lexical_generation == self.corpus_generation:
+            return
+        self.lexical_index.build(self.iter_chunks())
+        self.lexical_generation = self.corpus_generation
+        # Hybrid results computed before the rebuild lacked lexical hits
+        self.result_cache.clear()
+    
+    def _refresh_matrix_index(self, export: bool = True) -> None:
+        """Re-export the memory-mapped matrix index if it is behind the corpus.
+        
+        With ``export=False`` (or in read-only mode) the index is only reopened;
+        exporting is left to callers holding the write lock.
+        """
+        if self.read_engine != "matrix" or self._current_matrix_index() is not None:
+            return
+        # Another process may already have exported this generation
+        self.matrix_index = MatrixIndex.open(self.matrix_directory, generation=self.corpus_generation)
+        if self._current_matrix_index() is not None:
+            self.result_cache.clear()
+            return
+        if self.read_only or not export:
+            logger.warning("Matrix index is behind the corpus; searching ChromaDB until it is re-exported")
+            return
+        started = time.perf_counter()
+        MatrixIndex.export(
+            self.matrix_directory,
+            self._iter_embedded_chunks(),
+            generation=self.corpus_generation,
+            embedding_tag=self.embedding_tag,
+            dtype=self.matrix_dtype,
+            hnsw_threshold=self.matrix_hnsw_threshold
+        )
+        self.matrix_index = MatrixIndex.open(self.matrix_directory)
+        self.result_cache.clear()
+        logger.info(f"Matrix index refreshed in {time.perf_counter() - started:.1f}s")
+    
+    def _current_matrix_index(self) -> Optional[MatrixIndex]:
+        """The matrix index, if it was exported from the current corpus with the current model"""
+        index = self.matrix_index
+        if index is None or index.generation != self.corpus_generation or index.embedding_tag != self.embedding_tag:
+            return None
+        return index
+    
+    async def _process_pdfs_locked(self, on_progress: Optional[Callable[[Path, str, float, int], None]] = None
+                                   ) -> ProcessingResult:
+        
+        manifest = await self._run(self._load_manifest)
+        self._sync_generation(manifest)
+        
+        # The early returns still bring the derived indexes up to date, e.g.
+        # on the first startup after a mode or model change
         if not self.references_dir.exists():
             logger.warning(f"References directory not found: {self.references_dir}")
+            await self._refresh_derived_indexes()
             return ProcessingResult(
                 message="References directory not found",
                 successful=0,
@@ -71,124 +587,543 @@ class VectorService:
             )
         
         pdf_files = list(self.references_dir.glob("*.pdf"))
+        details = []
+        
+        # Drop PDFs deleted since the last ingest from the index
+        removed = await self._run(self._prune_removed_pdfs, manifest, {pdf_file.name for pdf_file in pdf_files})
+        for name in removed:
+            details.append(f"Removed deleted PDF: {name}")
+        
         if not pdf_files:
             logger.info("No PDF files found in references directory")
+            if removed:
+                self._bump_generation(manifest)
+                await self._run(self._save_manifest, manifest)
+            await self._refresh_derived_indexes()
             return ProcessingResult(
                 message="No PDF files found in references directory",
                 successful=0,
-                failed=0
+                failed=0,
+                details=details
             )
         
         successful = 0
         failed = 0
-        details = []
+        skipped = 0
         
-        for pdf_file in pdf_files:
-            try:
-                await self._process_single_pdf(pdf_file)
-                successful += 1
-                details.append(f"Successfully processed: {pdf_file.name}")
-                logger.info(f"Successfully processed: {pdf_file.name}")
-            except Exception as e:
+        fingerprint = self._ingest_fingerprint()
+        # Check the unified collection's embedding tag (and recreate it) once,
+        # before PDFs are processed concurrently on worker threads
+        unified = await self._run(self._get_unified_collection) if self.storage_layout == "unified" else None
+        
+        semaphore = asyncio.Semaphore(self.ingest_concurrency)
+        
+        async def process(pdf_file: Path):
+            async with semaphore:
+                started = time.perf_counter()
+                try:
+                    status = await self._process_single_pdf(pdf_file, manifest, fingerprint, unified)
+                except Exception:
+                    if on_progress is not None:
+                        on_progress(pdf_file, "failed", time.perf_counter() - started, 0)
+                    raise
+                elapsed = time.perf_counter() - started
+                metrics.INGEST_PDF_SECONDS.labels(status=status).observe(elapsed)
+                chunk_count = manifest["files"].get(pdf_file.name, {}).get("chunk_count", 0)
+                if status != "unchanged":
+                    metrics.INGEST_CHUNKS.inc(chunk_count)
+                    metrics.INGEST_BYTES.inc(pdf_file.stat().st_size)
+                    metrics.INGEST_PDF_CHUNKS_PER_SECOND.observe(chunk_count / max(elapsed, 1e-6))
+                if on_progress is not None:
+                    on_progress(pdf_file, status, elapsed, chunk_count)
+                return status
+        
+        outcomes = await asyncio.gather(
+            *(process(pdf_file) for pdf_file in pdf_files),
+            return_exceptions=True
+        )
+        
+        for pdf_file, outcome in zip(pdf_files, outcomes):
+            if isinstance(outcome, asyncio.CancelledError):
+                raise outcome
+            if isinstance(outcome, BaseException):
                 failed += 1
-                error_msg = f"Failed to process {pdf_file.name}: {str(e)}"
+                error_msg = f"Failed to process {pdf_file.name}: {str(outcome)}"
                 details.append(error_msg)
                 logger.error(error_msg)
+            elif outcome == "unchanged":
+                skipped += 1
+                details.append(f"Skipped unchanged: {pdf_file.name}")
+                logger.info(f"Skipped unchanged: {pdf_file.name}")
+            else:
+                successful += 1
+                details.append(f"Successfully processed ({outcome}): {pdf_file.name}")
+                logger.info(f"Successfully processed ({outcome}): {pdf_file.name}")
+        
+        if successful or removed:
+            self._bump_generation(manifest)
+        await self._run(self._save_manifest, manifest)
+        await self._refresh_derived_indexes()
         
         total_files = len(pdf_files)
-        message = f"PDF processing completed. {successful}/{total_files} files processed successfully."
+        message = (
+            f"PDF processing completed. {successful}/{total_files} files processed successfully, "
+            f"{skipped} unchanged, {len(removed)} removed."
+        )
         
         return ProcessingResult(
             message=message,
             successful=successful,
             failed=failed,
+            skipped=skipped,
             details=details
         )
     
-    async def _process_single_pdf(self, pdf_path: Path) -> None:
-        """Process a single PDF file"""
-        # Extract text from PDF
-        text_content = self._extract_text_from_pdf(pdf_path)
-        if not text_content.strip():
-            raise ValueError("No text content extracted from PDF")
+    def _bump_generation(self, manifest: Dict[str, Any]) -> None:
+        """Record that the corpus changed, invalidating cached search results"""
+        self.corpus_generation = manifest.get("generation", self.corpus_generation) + 1
+        manifest["generation"] = self.corpus_generation
+        self.result_cache.clear()
+        logger.info(f"Corpus generation is now {self.corpus_generation}")
+    
+    def _ingest_fingerprint(self) -> str:
+        """Fingerprint of the settings that determine chunk boundaries and vectors"""
+        settings = {
+            "model": self.embedding_tag,
+            "chunk_size": self.chunk_size,
+            "chunk_overlap": self.chunk_overlap,
+            "separators": self.chunk_separators,
+        }
+        return hashlib.sha256(json.dumps(settings, sort_keys=True).encode("utf-8")).hexdigest()
+    
+    def _load_manifest(self) -> Dict[str, Any]:
+        """Load the ingestion manifest, returning an empty one if missing or unreadable"""
+        try:
+            with open(self.manifest_path, "r", encoding="utf-8") as f:
+                manifest = json.load(f)
+            if isinstance(manifest, dict) and isinstance(manifest.get("files"), dict):
+                return manifest
+            logger.warning(f"Ignoring malformed ingestion manifest at {self.manifest_path}")
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            logger.warning(f"Could not read ingestion manifest: {str(e)}")
+        return {"version": 1, "generation": 0, "files": {}}
+    
+    def _save_manifest(self, manifest: Dict[str, Any]) -> None:
+        """Atomically write the ingestion manifest next to the index"""
+        self.manifest_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.manifest_path.with_suffix(".tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(manifest, f, indent=2, sort_keys=True)
+        os.replace(tmp_path, self.manifest_path)
+    
+    @staticmethod
+    def _file_sha256(path: Path) -> str:
+        """Content hash of a file, read in blocks"""
+        digest = hashlib.sha256()
+        with open(path, "rb") as f:
+            for block in iter(lambda: f.read(1024 * 1024), b""):
+                digest.update(block)
+        return digest.hexdigest()
+    
+    def _get_existing_collection(self, collection_name: str):
+        """Return the named collection, or None if it does not exist"""
+        try:
+            return self.client.get_collection(collection_name)
+        except Exception:
+            return None
+    
+    def _get_unified_collection(self):
+        """Return the single collection used by the unified storage layout.
+        
+        A unified collection built with a different embedding backend/model
+        is dropped and recreated, since its vectors cannot be compared.
+        """
+        collection = self._get_existing_collection(self.unified_collection_name)
+        if collection is not None and self._collection_tag(collection.metadata) != self.embedding_tag:
+            logger.warning(
+                f"Unified collection was built with '{self._collection_tag(collection.metadata)}', "
+                f"not '{self.embedding_tag}'; recreating it"
+            )
+            self.client.delete_collection(name=self.unified_collection_name)
+            collection = None
+        if collection is None:
+            collection = self.client.get_or_create_collection(
+                name=self.unified_collection_name,
+                metadata={"layout": "unified", "embedding": self.embedding_tag}
+            )
+        return collection
+    
+    @staticmethod
+    def _collection_tag(metadata: Optional[Dict[str, Any]]) -> str:
+        """Embedding tag of a collection; untagged collections predate pluggable backends"""
+        return (metadata or {}).get("embedding", "sentence-transformers/all-MiniLM-L6-v2")
+    
+    async def _process_single_pdf(self, pdf_path: Path, manifest: Dict[str, Any],
+                                  fingerprint: str, unified=None) -> str:
+        """Process a single PDF file, re-embedding only chunks that changed.
+        
+        Pages stream from the extraction pool through the splitter into
+        fixed-size embedding batches, so memory is bounded by the split
+        window, the extraction lookahead and the batch size rather than by
+        the size of the PDF.
+        
+        Returns "unchanged", "updated" or "created".
+        """
+        # Size and mtime unchanged since the last ingest: skip hashing and
+        # listing stored chunk IDs, which dominates restart time
+        if await self._run(self._is_current, pdf_path, manifest, fingerprint):
+            return "unchanged"
+        
+        file_hash = await self._run(self._file_sha256, pdf_path)
+        collection, stored_ids, same_settings = await self._run(
+            self._load_index_state, pdf_path, manifest, fingerprint, unified
+        )
+        
+        # Same bytes, same chunker, model and layout: the stored index is current
+        if same_settings and manifest["files"][pdf_path.name].get("sha256") == file_hash:
+            stat = pdf_path.stat()
+            manifest["files"][pdf_path.name].update(size=stat.st_size, mtime_ns=stat.st_mtime_ns)
+            if self.storage_layout != "unified":
+                self.collections[collection.name] = collection
+            return "unchanged"
+        
+        # Chunk-level diff is only valid if the existing vectors were produced
+        # with the same chunker and model; otherwise rebuild this document.
+        status = "updated" if same_settings else "created"
+        collection_name = self._sanitize_collection_name(pdf_path.stem)
+        splitter = _StreamingSplitter(self.text_splitter, self.split_window_chars)
+        
+        chunk_ids: List[str] = []
+        occurrences: Dict[str, int] = {}
+        pending_chunks: List[str] = []
+        pending_ids: List[str] = []
+        pending_indexes: List[int] = []
+        write_task: Optional[asyncio.Future] = None
+        prepared = False
+        added = 0
+        
+        async def flush() -> None:
+            nonlocal collection, stored_ids, write_task, prepared, added
+            if not prepared:
+                # Only touch the index once the PDF has produced chunks
+                collection, stored_ids = await self._run(
+                    self._prepare_collection, pdf_path, collection, stored_ids, same_settings
+                )
+                prepared = True
+            if not pending_chunks:
+                return
+            
+            await self.ensure_model()
+            embeddings = await self._run(self._encode_documents, list(pending_chunks))
+            if write_task is not None:
+                await write_task
+            # Write this batch while the next one is being encoded
+            write_task = asyncio.ensure_future(self._run(
+                collection.add,
+                documents=list(pending_chunks),
+                embeddings=embeddings.tolist(),
+                ids=list(pending_ids),
+                metadatas=[{"source": pdf_path.name, "chunk_index": i} for i in pending_indexes]
+            ))
+            added += len(pending_chunks)
+            pending_chunks.clear()
+            pending_ids.clear()
+            pending_indexes.clear()
+        
+        async def accept(chunks: List[str]) -> None:
+            for chunk in chunks:
+                chunk_id = self._next_chunk_id(collection_name, chunk, occurrences)
+                chunk_ids.append(chunk_id)
+                if chunk_id not in stored_ids or not same_settings:
+                    pending_chunks.append(chunk)
+                    pending_ids.append(chunk_id)
+                    pending_indexes.append(len(chunk_ids) - 1)
+                if len(pending_chunks) >= self.embed_batch_size:
+                    await flush()
+        
+        try:
+            async for pages in self._iter_page_ranges(pdf_path):
+                await accept(splitter.feed("".join(pages)))
+            await accept(splitter.finish())
+            
+            if not chunk_ids:
+                raise ValueError("No text content extracted from PDF")
+            
+            await flush()
+        finally:
+            if write_task is not None:
+                await write_task
+        
+        removed = await self._run(self._finalize_chunks, collection, pdf_path, chunk_ids, stored_ids)
+        
+        logger.info(
+            f"Indexed '{pdf_path.name}' into '{collection.name}': {added} chunks added, "
+            f"{removed} removed, {len(chunk_ids) - added} unchanged"
+        )
+        
+        # Store collection reference
+        if self.storage_layout != "unified":
+            self.collections[collection_name] = collection
+        
+        stat = pdf_path.stat()
+        manifest["files"][pdf_path.name] = {
+            "sha256": file_hash,
+            "size": stat.st_size,
+            "mtime_ns": stat.st_mtime_ns,
+            "fingerprint": fingerprint,
+            "layout": self.storage_layout,
+            "collection": collection.name,
+            "chunk_count": len(chunk_ids),
+        }
+        return status
+    
+    async def _iter_page_ranges(self, pdf_path: Path) -> AsyncIterator[List[str]]:
+        """Yield page texts in order, range by range, keeping a bounded number of
+        extraction tasks in flight in the process pool"""
+        loop = asyncio.get_running_loop()
+        executor = self._get_pdf_executor()
+        
+        page_count = await loop.run_in_executor(executor, count_pages, pdf_path)
+        in_flight: deque = deque()
+        try:
+            for start in range(0, page_count, self.pages_per_task):
+                end = min(start + self.pages_per_task, page_count)
+                in_flight.append(loop.run_in_executor(executor, extract_page_range, pdf_path, start, end))
+                if len(in_flight) >= self.extract_lookahead:
+                    yield await in_flight.popleft()
+            while in_flight:
+                yield await in_flight.popleft()
+        finally:
+            for future in in_flight:
+                future.cancel()
+    
+    def _encode_documents(self, documents: List[str]) -> np.ndarray:
+        """Encode chunks to a float32 matrix"""
+        metrics.EMBEDDING_TEXTS.labels(kind="document").inc(len(documents))
+        with metrics.observe(metrics.EMBEDDING_ENCODE_SECONDS, kind="document"):
+            return self.embedding_backend.encode(documents)
+    
+    @staticmethod
+    def _next_chunk_id(collection_name: str, chunk: str, occurrences: Dict[str, int]) -> str:
+        """Content-addressed chunk ID; repeated chunks get an occurrence suffix"""
+        chunk_hash = hashlib.sha1(chunk.encode("utf-8")).hexdigest()[:16]
+        occurrence = occurrences.get(chunk_hash, 0)
+        occurrences[chunk_hash] = occurrence + 1
+        return f"{collection_name}_{chunk_hash}_{occurrence}"
+    
+    def _is_current(self, pdf_path: Path, manifest: Dict[str, Any], fingerprint: str) -> bool:
+        """Cheap up-to-date check from the manifest and file metadata alone"""
+        entry = manifest["files"].get(pdf_path.name)
+        if (
+            entry is None
+            or entry.get("fingerprint") != fingerprint
+            or entry.get("layout", "per_document") != self.storage_layout
+        ):
+            return False
+        
+        stat = pdf_path.stat()
+        if entry.get("size") != stat.st_size or entry.get("mtime_ns") != stat.st_mtime_ns:
+            return False
+        
+        if self.storage_layout == "unified":
+            collection = self._get_existing_collection(self.unified_collection_name)
+        else:
+            collection = self._get_existing_collection(entry.get("collection", ""))
+        if collection is None or self._collection_tag(collection.metadata) != self.embedding_tag:
+            return False
+        
+        if self.storage_layout != "unified":
+            self.collections[collection.name] = collection
+        return True
+    
+    def _load_index_state(self, pdf_path: Path, manifest: Dict[str, Any], fingerprint: str, unified=None):
+        """Return (collection, stored chunk IDs, whether stored vectors are reusable).
+        
+        In the unified layout ``unified`` is the collection prepared for this
+        run by ``_get_unified_collection``.
+        """
+        entry = manifest["files"].get(pdf_path.name)
         
-        # Split text into chunks
-        chunks = self.text_splitter.split_text(text_content)
-        if not chunks:
-            raise ValueError("No chunks created from PDF text")
+        if self.storage_layout == "unified":
+            collection = unified
+            stored_ids = set(collection.get(where={"source": pdf_path.name}, include=[])["ids"])
+            indexed = bool(stored_ids)
+        else:
+            collection_name = self._sanitize_collection_name(pdf_path.stem)
+            collection = self._get_existing_collection(collection_name)
+            stored_ids = set(collection.get(include=[])["ids"]) if collection is not None else set()
+            indexed = collection is not None and self._collection_tag(collection.metadata) == self.embedding_tag
+        
+        same_settings = (
+            entry is not None
+            and indexed
+            and entry.get("fingerprint") == fingerprint
+            and entry.get("layout", "per_document") == self.storage_layout
+        )
+        return collection, stored_ids, same_settings
+    
+    def _prepare_collection(self, pdf_path: Path, collection, stored_ids: set, same_settings: bool):
+        """Return the collection to write into and the chunk IDs it already holds,
+        clearing this document first when its stored vectors cannot be reused"""
+        if same_settings:
+            return collection, stored_ids
         
-        # Create collection name from filename (sanitized)
         collection_name = self._sanitize_collection_name(pdf_path.stem)
+        if self.storage_layout == "unified":
+            if stored_ids:
+                collection.delete(where={"source": pdf_path.name})
+                logger.info(f"Removed {len(stored_ids)} stale chunks for '{pdf_path.name}'")
+            return collection, set()
         
         # Handle existing collections by deleting and recreating them
-        try:
-            # Try to delete existing collection first
-            self.client.delete_collection(name=collection_name)
-            logger.info(f"Deleted existing collection '{collection_name}'")
-        except ValueError:
-            # Collection doesn't exist, which is fine
-            pass
-        except Exception as e:
-            logger.warning(f"Could not delete existing collection '{collection_name}': {str(e)}")
+        if collection is not None:
+            try:
+                self.client.delete_collection(name=collection_name)
+                logger.info(f"Deleted existing collection '{collection_name}'")
+            except Exception as e:
+                logger.warning(f"Could not delete existing collection '{collection_name}': {str(e)}")
         
         # Create new collection
         try:
             collection = self.client.create_collection(
                 name=collection_name,
-                metadata={"source": pdf_path.name}
+                metadata={"source": pdf_path.name, "embedding": self.embedding_tag}
             )
             logger.info(f"Created collection '{collection_name}'")
         except Exception as e:
             raise ValueError(f"Failed to create collection '{collection_name}': {str(e)}")
+        return collection, set()
+    
+    def _finalize_chunks(self, collection, pdf_path: Path, chunk_ids: List[str], stored_ids: set) -> int:
+        """Delete chunks no longer produced and write final positional metadata.
         
-        # Generate embeddings and store chunks
-        embeddings = self.embedding_model.encode(chunks).tolist()
+        Returns the number of chunks removed.
+        """
+        new_ids = set(chunk_ids)
+        stale_ids = [chunk_id for chunk_id in stored_ids if chunk_id not in new_ids]
+        for start in range(0, len(stale_ids), self.embed_batch_size):
+            collection.delete(ids=stale_ids[start:start + self.embed_batch_size])
         
-        # Prepare documents for insertion
-        ids = [f"{collection_name}_chunk_{i}" for i in range(len(chunks))]
-        metadatas = [
-            {
-                "source": pdf_path.name,
-                "chunk_index": i,
-                "total_chunks": len(chunks)
-            }
-            for i in range(len(chunks))
-        ]
+        # total_chunks is only known once the whole document has streamed through
+        total = len(chunk_ids)
+        for start in range(0, total, self.embed_batch_size):
+            batch_ids = chunk_ids[start:start + self.embed_batch_size]
+            collection.update(
+                ids=batch_ids,
+                metadatas=[
+                    {"source": pdf_path.name, "chunk_index": start + offset, "total_chunks": total}
+                    for offset in range(len(batch_ids))
+                ]
+            )
+        return len(stale_ids)
+    
+    def _prune_removed_pdfs(self, manifest: Dict[str, Any], present: set) -> List[str]:
+        """Delete the chunks and manifest entries of PDFs no longer in the references directory.
         
-        # Add documents to collection
-        collection.add(
-            documents=chunks,
-            embeddings=embeddings,
-            ids=ids,
-            metadatas=metadatas
-        )
+        Returns the names of the removed PDFs.
+        """
+        present_collections = {self._sanitize_collection_name(Path(name).stem) for name in present}
+        unified = self._get_existing_collection(self.unified_collection_name)
+        removed = []
+        for name in sorted(set(manifest["files"]) - present):
+            entry = manifest["files"][name]
+            try:
+                # Chunks may be in both layouts after a migration that kept its sources
+                if unified is not None:
+                    unified.delete(where={"source": name})
+                if entry.get("layout", "per_document") != "unified":
+                    collection_name = entry.get("collection") or self._sanitize_collection_name(Path(name).stem)
+                    # Another PDF whose name sanitizes the same way may now own the collection
+                    if collection_name not in present_collections:
+                        if self._get_existing_collection(collection_name) is not None:
+                            self.client.delete_collection(name=collection_name)
+                        self.collections.pop(collection_name, None)
+            except Exception as e:
+                logger.warning(f"Could not remove chunks of deleted PDF '{name}': {str(e)}")
+                continue
+            del manifest["files"][name]
+            removed.append(name)
+            logger.info(f"Removed deleted PDF '{name}' from the index")
+        return removed
+    
+    async def migrate_to_unified(self, delete_source: bool = False,
+                                 batch_size: int = 500) -> ProcessingResult:
+        """Copy chunks from the per-PDF collections into the unified collection.
         
-        # Store collection reference
-        self.collections[collection_name] = collection
+        Embeddings are copied as stored, so nothing is re-encoded. Chunk IDs are
+        already prefixed with the per-PDF collection name and stay unique.
+        """
+        if not self.is_initialized():
+            raise RuntimeError("Vector service not initialized")
+        if self.read_only:
+            raise RuntimeError("Vector service is read-only")
         
-        logger.info(f"Added {len(chunks)} chunks to collection '{collection_name}'")
+        async with self._write_lock():
+            return await self._run(self._migrate_to_unified_sync, delete_source, batch_size)
     
-    def _extract_text_from_pdf(self, pdf_path: Path) -> str:
-        """Extract text content from a PDF file"""
-        text_content = ""
+    def _migrate_to_unified_sync(self, delete_source: bool, batch_size: int) -> ProcessingResult:
+        unified = self._get_unified_collection()
+        manifest = self._load_manifest()
+        self._sync_generation(manifest)
+        successful = 0
+        failed = 0
+        details = []
         
-        try:
-            with open(pdf_path, 'rb') as file:
-                pdf_reader = PyPDF2.PdfReader(file)
+        for collection_info in self.client.list_collections():
+            if collection_info.name == self.unified_collection_name:
+                continue
+            if self._collection_tag(collection_info.metadata) != self.embedding_tag:
+                details.append(f"Skipped '{collection_info.name}': built with a different embedding model")
+                continue
+            try:
+                source_collection = self.client.get_collection(collection_info.name)
+                total = source_collection.count()
+                source_name = (collection_info.metadata or {}).get("source")
                 
-                for page_num, page in enumerate(pdf_reader.pages):
-                    try:
-                        page_text = page.extract_text()
-                        if page_text:
-                            text_content += page_text + "\n"
-                    except Exception as e:
-                        logger.warning(f"Error extracting text from page {page_num + 1} of {pdf_path.name}: {str(e)}")
-                        continue
-                        
-        except Exception as e:
-            raise ValueError(f"Failed to read PDF file {pdf_path.name}: {str(e)}")
+                for offset in range(0, total, batch_size):
+                    batch = source_collection.get(
+                        include=["documents", "embeddings", "metadatas"],
+                        limit=batch_size,
+                        offset=offset
+                    )
+                    unified.upsert(
+                        ids=batch["ids"],
+                        documents=batch["documents"],
+                        embeddings=batch["embeddings"],
+                        metadatas=batch["metadatas"]
+                    )
+                
+                if source_name and source_name in manifest["files"]:
+                    manifest["files"][source_name]["layout"] = "unified"
+                    manifest["files"][source_name]["collection"] = self.unified_collection_name
+                
+                if delete_source:
+                    self.client.delete_collection(name=collection_info.name)
+                    self.collections.pop(collection_info.name, None)
+                
+                successful += 1
+                details.append(f"Migrated {total} chunks from '{collection_info.name}'")
+                logger.info(f"Migrated {total} chunks from '{collection_info.name}' to unified collection")
+            except Exception as e:
+                failed += 1
+                error_msg = f"Failed to migrate collection {collection_info.name}: {str(e)}"
+                details.append(error_msg)
+                logger.error(error_msg)
+        
+        if successful:
+            self._bump_generation(manifest)
+        self._save_manifest(manifest)
+        self._refresh_lexical_index()
+        self._refresh_matrix_index()
         
-        return text_content
+        return ProcessingResult(
+            message=f"Migration completed. {successful} collections copied into '{self.unified_collection_name}'.",
+            successful=successful,
+            failed=failed,
+            details=details
+        )
     
     def _sanitize_collection_name(self, name: str) -> str:
         """Sanitize collection name for ChromaDB"""
@@ -201,62 +1136,319 @@ class VectorService:
             sanitized = f"doc_{sanitized}"
         return sanitized.lower()
     
-    async def search(self, query: str, n_results: int = 5) -> List[SearchResult]:
-        """Search across all collections"""
+    async def search(self, query: str, n_results: int = 5,
+                     sources: Optional[List[str]] = None,
+                     mode: Optional[str] = None) -> List[SearchResult]:
+        """Search across all collections, optionally restricted to source PDFs"""
+        results = await self.search_many([query], n_results=n_results, sources=sources, mode=mode)
+        return results[0]
+    
+    async def search_many(self, queries: List[str], n_results: int = 5,
+                          sources: Optional[List[str]] = None,
+                          mode: Optional[str] = None,
+                          lexical_queries: Optional[List[str]] = None) -> List[List[SearchResult]]:
+        """Search for several queries at once.
+        
+        All queries are encoded in one batch and each collection receives a
+        single multi-embedding query. Results are returned in query order.
+        ``mode`` is "vector" or "hybrid" and defaults to VECTOR_SEARCH_MODE.
+        In hybrid mode ``lexical_queries`` (one per query) can replace the
+        text given to BM25, e.g. the bare drug name.
+        """
+        mode = mode or self.search_mode
+        if mode not in ("vector", "hybrid"):
+            raise ValueError(f"Unknown search mode: {mode}")
         if not self.is_initialized():
             raise RuntimeError("Vector service not initialized")
         
-        # Generate query embedding
-        query_embedding = self.embedding_model.encode([query]).tolist()[0]
+        if not queries:
+            return []
+        if lexical_queries is None:
+            lexical_queries = list(queries)
+        elif len(lexical_queries) != len(queries):
+            raise ValueError("lexical_queries must match queries one to one")
+        
+        await self.ensure_model()
+        with metrics.observe(metrics.VECTOR_SEARCH_SECONDS, mode=mode):
+            return await self._run(
+                self._search_many_sync, list(queries), n_results, sources, mode, list(lexical_queries)
+            )
+    
+    def _search_many_sync(self, queries: List[str], n_results: int, sources: Optional[List[str]],
+                          mode: str, lexical_queries: List[str]) -> List[List[SearchResult]]:
+        # Results only change when the corpus does, so the generation is part of the key
+        keys = [
+            self._result_cache_key(query, n_results, sources, mode, lexical_query)
+            for query, lexical_query in zip(queries, lexical_queries)
+        ]
+        results: List[Optional[List[SearchResult]]] = [self.result_cache.get(key) for key in keys]
+        
+        missing = [i for i, cached in enumerate(results) if cached is None]
+        if missing:
+            computed = self._search_uncached(
+                [queries[i] for i in missing], n_results, sources, mode,
+                [lexical_queries[i] for i in missing]
+            )
+            for i, query_results in zip(missing, computed):
+                results[i] = query_results
+                self.result_cache.put(keys[i], query_results)
+        
+        return [list(query_results) for query_results in results]
+    
+    def _result_cache_key(self, query: str, n_results: int, sources: Optional[List[str]],
+                          mode: str, lexical_query: str):
+        return (
+            self.corpus_generation,
+            self.storage_layout,
+            mode,
+            normalize_query(query),
+            normalize_query(lexical_query) if mode == "hybrid" else None,
+            n_results,
+            tuple(sorted(sources)) if sources else None,
+        )
+    
+    def _search_uncached(self, queries: List[str], n_results: int, sources: Optional[List[str]],
+                         mode: str, lexical_queries: List[str]) -> List[List[SearchResult]]:
+        # Generate query embeddings in one batch
+        query_embeddings = self._encode_queries(queries)
+        
+        if mode != "hybrid":
+            return self._vector_search(query_embeddings.tolist(), n_results, sources)
+        
+        candidates = max(n_results, self.hybrid_candidates)
+        vector_results = self._vector_search(query_embeddings.tolist(), candidates, sources)
+        return [
+            self._fuse_rankings(
+                query_embeddings[i],
+                vector_results[i],
+                self.lexical_index.search(lexical_query, candidates, sources),
+                n_results
+            )
+            for i, lexical_query in enumerate(lexical_queries)
+        ]
+    
+    def _fuse_rankings(self, query_embedding: np.ndarray, vector_results: List[SearchResult],
+                       lexical_results: List[Tuple[LexicalDocument, float]],
+                       n_results: int) -> List[SearchResult]:
+        """Reciprocal rank fusion of a vector and a BM25 ranking.
+        
+        Chunks are identified by (source, chunk_index). Chunks found only
+        lexically get their distance from the stored embedding so that
+        ``distance`` keeps its meaning; results are ordered by fused score.
+        """
+        scores: Dict[Tuple[str, Any], float] = {}
+        by_key: Dict[Tuple[str, Any], SearchResult] = {}
+        lexical_only: Dict[Tuple[str, Any], LexicalDocument] = {}
+        
+        for rank, result in enumerate(vector_results):
+            key = (result.source, result.metadata.get("chunk_index"))
+            scores[key] = scores.get(key, 0.0) + 1.0 / (self.rrf_k + rank + 1)
+            by_key.setdefault(key, result)
+        
+        for rank, (document, _) in enumerate(lexical_results):
+            key = (document.metadata.get("source", "Unknown"), document.metadata.get("chunk_index"))
+            scores[key] = scores.get(key, 0.0) + 1.0 / (self.rrf_k + rank + 1)
+            if key not in by_key:
+                lexical_only[key] = document
+        
+        ranked = sorted(scores, key=scores.get, reverse=True)[:n_results]
+        distances = self._stored_distances(
+            query_embedding, [lexical_only[key] for key in ranked if key in lexical_only]
+        )
+        
+        fused = []
+        for key in ranked:
+            result = by_key.get(key)
+            if result is None:
+                document = lexical_only[key]
+                result = SearchResult(
+                    content=document.content,
+                    source=key[0],
+                    distance=distances.get(document.chunk_id, float("inf")),
+                    metadata=document.metadata
+                )
+            fused.append(result)
+        return fused
+    
+    def _stored_distances(self, query_embedding: np.ndarray,
+                          documents: List[LexicalDocument]) -> Dict[str, float]:
+        """Squared L2 distance (ChromaDB's default space) from the query to stored chunk embeddings"""
+        ids_by_collection: Dict[str, List[str]] = {}
+        for document in documents:
+            ids_by_collection.setdefault(document.collection, []).append(document.chunk_id)
+        
+        matrix = self._current_matrix_index()
+        if matrix is not None:
+            return matrix.distances(query_embedding, [document.chunk_id for document in documents])
+        
+        distances = {}
+        for collection_name, ids in ids_by_collection.items():
+            collection = self._get_existing_collection(collection_name)
+            if collection is None:
+                continue
+            stored = collection.get(ids=ids, include=["embeddings"])
+            for chunk_id, embedding in zip(stored["ids"], stored["embeddings"]):
+                diff = np.asarray(embedding, dtype=np.float32) - query_embedding
+                distances[chunk_id] = float(np.dot(diff, diff))
+        return distances
+    
+    def _vector_search(self, query_embeddings: List[List[float]], n_results: int,
+                       sources: Optional[List[str]]) -> List[List[SearchResult]]:
+        """Nearest chunks by embedding distance for each query embedding"""
+        matrix = self._current_matrix_index()
+        if matrix is not None:
+            return self._search_matrix(matrix, query_embeddings, n_results, sources)
+        
+        if self.storage_layout == "unified":
+            return self._search_unified(query_embeddings, n_results, sources)
         
         # Get all collections
         all_collections = self.client.list_collections()
         
         if not all_collections:
             logger.warning("No collections found")
-            return []
+            return [[] for _ in query_embeddings]
         
-        all_results = []
+        all_results: List[List[SearchResult]] = [[] for _ in query_embeddings]
         
         # Search each collection
         for collection_info in all_collections:
+            if collection_info.name == self.unified_collection_name:
+                continue
+            if sources and (collection_info.metadata or {}).get("source") not in sources:
+                continue
+            if self._collection_tag(collection_info.metadata) != self.embedding_tag:
+                logger.warning(f"Skipping collection {collection_info.name}: built with a different embedding model")
+                continue
             try:
                 collection = self.client.get_collection(collection_info.name)
                 
                 # Query the collection
-                results = collection.query(
-                    query_embeddings=[query_embedding],
-                    n_results=min(n_results, 10)  # Limit per collection
-                )
+                with metrics.observe(metrics.VECTOR_COLLECTION_QUERY_SECONDS, collection=collection_info.name):
+                    results = collection.query(
+                        query_embeddings=query_embeddings,
+                        n_results=min(n_results, 10)  # Limit per collection
+                    )
                 
-                # Process results
-                if results['documents'] and results['documents'][0]:
-                    for i, (doc, distance, metadata) in enumerate(zip(
-                        results['documents'][0],
-                        results['distances'][0],
-                        results['metadatas'][0]
-                    )):
-                        all_results.append(SearchResult(
-                            content=doc,
-                            source=metadata.get('source', 'Unknown'),
-                            distance=distance,
-                            metadata=metadata
-                        ))
+                for query_index in range(len(query_embeddings)):
+                    all_results[query_index].extend(self._to_search_results(results, query_index))
                         
             except Exception as e:
                 logger.error(f"Error searching collection {collection_info.name}: {str(e)}")
                 continue
         
         # Sort by distance and return top results
-        all_results.sort(key=lambda x: x.distance)
-        return all_results[:n_results]
+        for query_results in all_results:
+            query_results.sort(key=lambda x: x.distance)
+        return [query_results[:n_results] for query_results in all_results]
+    
+    def _encode_queries(self, queries: List[str]) -> np.ndarray:
+        """Encode queries, reusing cached embeddings and batching the misses"""
+        keys = [(self.embedding_tag, normalize_query(query)) for query in queries]
+        embeddings: List[Optional[np.ndarray]] = [self.embedding_cache.get(key) for key in keys]
+        
+        missing = [i for i, embedding in enumerate(embeddings) if embedding is None]
+        if missing:
+            metrics.EMBEDDING_TEXTS.labels(kind="query").inc(len(missing))
+            with metrics.observe(metrics.EMBEDDING_ENCODE_SECONDS, kind="query"):
+                encoded = self.embedding_backend.encode([queries[i] for i in missing])
+            for row, i in enumerate(missing):
+                embedding = encoded[row].copy()
+                embeddings[i] = embedding
+                self.embedding_cache.put(keys[i], embedding)
+        
+        return np.vstack(embeddings)
+    
+    def cache_stats(self) -> Dict[str, Any]:
+        """Hit/miss/eviction counters for the in-process caches"""
+        return {
+            "corpus_generation": self.corpus_generation,
+            "embedding_cache": self.embedding_cache.stats(),
+            "result_cache": self.result_cache.stats(),
+            "lexical_index": {"chunks": len(self.lexical_index), "generation": self.lexical_generation},
+            "matrix_index": {
+                "engine": self.read_engine,
+                "chunks": len(self.matrix_index) if self.matrix_index is not None else 0,
+                "generation": self.matrix_index.generation if self.matrix_index is not None else None,
+                "current": self._current_matrix_index() is not None
+            }
+        }
+    
+    def clear_caches(self) -> None:
+        """Drop all cached entries"""
+        self.embedding_cache.clear()
+        self.result_cache.clear()
+    
+    @staticmethod
+    def _results_size(results: List[SearchResult]) -> int:
+        """Approximate memory held by a cached result list"""
+        return sum(len(result.content) + 256 for result in results) + 64
+    
+    def _search_unified(self, query_embeddings: List[List[float]], n_results: int,
+                        sources: Optional[List[str]] = None) -> List[List[SearchResult]]:
+        """Single ANN query against the unified collection"""
+        collection = self._get_existing_collection(self.unified_collection_name)
+        if collection is None:
+            logger.warning("Unified collection not found")
+            return [[] for _ in query_embeddings]
+        if self._collection_tag(collection.metadata) != self.embedding_tag:
+            logger.warning("Unified collection was built with a different embedding model; re-ingest required")
+            return [[] for _ in query_embeddings]
+        
+        where = None
+        if sources:
+            where = {"source": sources[0]} if len(sources) == 1 else {"source": {"$in": list(sources)}}
+        
+        with metrics.observe(metrics.VECTOR_COLLECTION_QUERY_SECONDS, collection=self.unified_collection_name):
+            results = collection.query(
+                query_embeddings=query_embeddings,
+                n_results=n_results,
+                where=where
+            )
+        return [self._to_search_results(results, i) for i in range(len(query_embeddings))]
+    
+    def _search_matrix(self, matrix: MatrixIndex, query_embeddings: List[List[float]], n_results: int,
+                       sources: Optional[List[str]] = None) -> List[List[SearchResult]]:
+        """Exact (or HNSW) top-k over the memory-mapped matrix index"""
+        with metrics.observe(metrics.VECTOR_COLLECTION_QUERY_SECONDS, collection="matrix_index"):
+            hits = matrix.search(np.asarray(query_embeddings, dtype=np.float32), n_results, sources)
+        return [
+            [
+                SearchResult(
+                    content=chunk.content,
+                    source=chunk.metadata.get("source", "Unknown"),
+                    distance=distance,
+                    metadata=chunk.metadata
+                )
+                for chunk, distance in query_hits
+            ]
+            for query_hits in hits
+        ]
+    
+    @staticmethod
+    def _to_search_results(results: Dict[str, Any], query_index: int = 0) -> List[SearchResult]:
+        """Convert a ChromaDB query response into SearchResult objects"""
+        search_results = []
+        if results['documents'] and results['documents'][query_index]:
+            for doc, distance, metadata in zip(
+                results['documents'][query_index],
+                results['distances'][query_index],
+                results['metadatas'][query_index]
+            ):
+                search_results.append(SearchResult(
+                    content=doc,
+                    source=metadata.get('source', 'Unknown'),
+                    distance=distance,
+                    metadata=metadata
+                ))
+        return search_results
     
     async def list_collections(self) -> List[Dict[str, Any]]:
         """List all available collections"""
         if not self.is_initialized():
             raise RuntimeError("Vector service not initialized")
         
-        collections = self.client.list_collections()
+        collections = await self._run(self.client.list_collections)
         return [
             {
                 "name": col.name,
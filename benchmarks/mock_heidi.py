@@ -0,0 +1,280 @@
+"""Local stand-in for the Heidi open API, for offline load and retry testing.
+
+    python -m benchmarks.mock_heidi --port 9000 --latency lognormal:400,0.5 \\
+        --response-format sse --token-rate 40 --fail 429=0.05,503=0.02
+
+Point the backend at it with HEIDI_BASE_URL=http://127.0.0.1:9000.
+Implements /jwt, /sessions and /sessions/{id}/ask-ai. Tokens and sessions
+are validated (unknown or expired ones get 401 and 404, like upstream), and
+/mock/stats reports request and injected-failure counts.
+"""
+import re
+import time
+import uuid
+import json
+import base64
+import math
+import random
+import asyncio
+import argparse
+from dataclasses import dataclass, field
+from datetime import datetime, timezone, timedelta
+from typing import Dict, Optional
+
+from fastapi import FastAPI, Header, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+from backend.drug_extractor import DrugExtractor
+
+SUMMARY_SENTENCES = [
+    "The identified medications are appropriate for the documented indication.",
+    "Review renal function before dosing and adjust for creatinine clearance.",
+    "Check the allergy history, in particular for beta-lactam hypersensitivity.",
+    "Take cultures before the first dose where possible and de-escalate once results return.",
+    "Monitor for gastrointestinal adverse effects and Clostridioides difficile infection.",
+    "Reassess the route of administration daily and switch to oral therapy when stable.",
+]
+
+
+class Latency:
+    """Latency distribution in milliseconds, parsed from "kind:params".
+
+    fixed:MS, uniform:MIN,MAX, normal:MEAN,STD, lognormal:MEDIAN,SIGMA,
+    exponential:MEAN
+    """
+
+    KINDS = ("fixed", "uniform", "normal", "lognormal", "exponential")
+
+    def __init__(self, spec: str):
+        kind, _, params = spec.partition(":")
+        if kind not in self.KINDS:
+            raise ValueError(f"Unknown latency distribution: {spec}")
+        self.spec = spec
+        self.kind = kind
+        self.params = [float(value) for value in params.split(",") if value]
+
+    def sample(self, rng: random.Random) -> float:
+        """One latency sample, in seconds"""
+        p = self.params
+        if self.kind == "fixed":
+            ms = p[0] if p else 0.0
+        elif self.kind == "uniform":
+            ms = rng.uniform(p[0], p[1])
+        elif self.kind == "normal":
+            ms = rng.gauss(p[0], p[1])
+        elif self.kind == "lognormal":
+            ms = rng.lognormvariate(0.0, p[1]) * p[0]
+        else:
+            ms = rng.expovariate(1.0 / p[0])
+        return max(ms, 0.0) / 1000
+
+
+def parse_failures(spec: str) -> Dict[int, float]:
+    """Parse "401=0.01,429=0.05" into {status: probability}"""
+    failures = {}
+    for item in filter(None, spec.split(",")):
+        status, _, probability = item.partition("=")
+        failures[int(status)] = float(probability)
+    if sum(failures.values()) > 1:
+        raise ValueError("Failure probabilities add up to more than 1")
+    return failures
+
+
+@dataclass
+class MockHeidiConfig:
+    """Behaviour of the mock server"""
+    latency: Latency = field(default_factory=lambda: Latency("fixed:50"))  # ask-ai, until the first byte
+    control_latency: Latency = field(default_factory=lambda: Latency("fixed:5"))  # /jwt and /sessions
+    response_format: str = "json"  # "json" body or "sse" token stream
+    token_rate: float = 50.0  # SSE tokens per second; 0 sends them back to back
+    summary_words: int = 120
+    failures: Dict[int, float] = field(default_factory=dict)  # status -> probability, on ask-ai
+    control_failures: Dict[int, float] = field(default_factory=dict)  # on /jwt and /sessions
+    retry_after: float = 1.0  # Retry-After seconds sent with 429/503
+    token_ttl: int = 3600
+    session_ttl: Optional[float] = None  # sessions expire (404) after this many seconds
+    extraction_answer: Optional[str] = None  # canned extraction answer; default: dictionary matcher
+    seed: Optional[int] = None
+
+
+def _fake_jwt(ttl_seconds: int) -> str:
+    def encode(data: dict) -> str:
+        return base64.urlsafe_b64encode(json.dumps(data).encode()).decode().rstrip("=")
+    claims = {"sub": "mock", "jti": uuid.uuid4().hex, "exp": int(time.time()) + ttl_seconds}
+    return f"{encode({'alg': 'none', 'typ': 'JWT'})}.{encode(claims)}.signature"
+
+
+def create_app(config: Optional[MockHeidiConfig] = None) -> FastAPI:
+    """Build the mock Heidi API.
+
+    Drug-extraction prompts are answered with ``extraction_answer`` or, by
+    default, with the drugs the local dictionary matcher finds in the
+    content; every other prompt gets a synthetic summary.
+    """
+    config = config or MockHeidiConfig()
+    app = FastAPI(title="Mock Heidi API")
+    rng = random.Random(config.seed)
+    extractor = DrugExtractor()
+    tokens: Dict[str, float] = {}
+    sessions: Dict[str, float] = {}
+    stats: Dict[str, Dict[str, int]] = {}
+
+    def count(endpoint: str, outcome: str) -> None:
+        stats.setdefault(endpoint, {}).setdefault(outcome, 0)
+        stats[endpoint][outcome] += 1
+
+    def injected_failure(endpoint: str, failures: Dict[int, float]) -> Optional[JSONResponse]:
+        roll = rng.random()
+        for status, probability in failures.items():
+            if roll < probability:
+                count(endpoint, str(status))
+                headers = {"Retry-After": str(int(math.ceil(config.retry_after)))} if status in (429, 503) else None
+                return JSONResponse(status_code=status, content={"detail": f"Injected {status}"}, headers=headers)
+            roll -= probability
+        return None
+
+    def authorized(authorization: Optional[str]) -> bool:
+        token = (authorization or "").removeprefix("Bearer ").strip()
+        expires = tokens.get(token)
+        return expires is not None and expires > time.time()
+
+    def answer(payload: dict) -> str:
+        command = payload.get("ai_command_text", "")
+        if "extract" in command.lower():
+            if config.extraction_answer is not None:
+                return config.extraction_answer
+            drugs = extractor.extract(payload.get("content", ""))
+            return ", ".join(drug.lower() for drug in drugs) or "none"
+        words = []
+        while len(words) < config.summary_words:
+            words.extend(rng.choice(SUMMARY_SENTENCES).split())
+        return " ".join(words[:config.summary_words])
+
+    @app.get("/jwt")
+    async def jwt(heidi_api_key: Optional[str] = Header(default=None)):
+        await asyncio.sleep(config.control_latency.sample(rng))
+        if not heidi_api_key:
+            count("jwt", "401")
+            return JSONResponse(status_code=401, content={"detail": "Missing Heidi-Api-Key"})
+        failure = injected_failure("jwt", config.control_failures)
+        if failure is not None:
+            return failure
+        token = _fake_jwt(config.token_ttl)
+        tokens[token] = time.time() + config.token_ttl
+        count("jwt", "200")
+        return {
+            "token": token,
+            "expiration_time": (datetime.now(timezone.utc) + timedelta(seconds=config.token_ttl)).isoformat(),
+        }
+
+    @app.post("/sessions")
+    async def create_session(authorization: Optional[str] = Header(default=None)):
+        await asyncio.sleep(config.control_latency.sample(rng))
+        if not authorized(authorization):
+            count("sessions", "401")
+            return JSONResponse(status_code=401, content={"detail": "Invalid or expired token"})
+        failure = injected_failure("sessions", config.control_failures)
+        if failure is not None:
+            return failure
+        session_id = str(uuid.uuid4())
+        sessions[session_id] = time.time()
+        count("sessions", "200")
+        return {"session_id": session_id}
+
+    @app.post("/sessions/{session_id}/ask-ai")
+    async def ask_ai(session_id: str, request: Request, authorization: Optional[str] = Header(default=None)):
+        if not authorized(authorization):
+            count("ask-ai", "401")
+            return JSONResponse(status_code=401, content={"detail": "Invalid or expired token"})
+        created = sessions.get(session_id)
+        if created is None or (config.session_ttl is not None and time.time() - created > config.session_ttl):
+            sessions.pop(session_id, None)
+            count("ask-ai", "404")
+            return JSONResponse(status_code=404, content={"detail": "Session not found"})
+        failure = injected_failure("ask-ai", config.failures)
+        if failure is not None:
+            return failure
+
+        payload = await request.json()
+        text = answer(payload)
+        await asyncio.sleep(config.latency.sample(rng))
+        count("ask-ai", "200")
+
+        if config.response_format == "json":
+            return {"response": text}
+
+        async def stream():
+            delay = 1.0 / config.token_rate if config.token_rate > 0 else 0.0
+            for index, token in enumerate(re.findall(r"\S+\s*", text)):
+                if index and delay:
+                    await asyncio.sleep(delay)
+                yield f"data: {json.dumps({'data': token})}\n\n"
+
+        return StreamingResponse(stream(), media_type="text/event-stream")
+
+    @app.get("/mock/stats")
+    async def mock_stats():
+        return {"active_tokens": len(tokens), "sessions": len(sessions), "requests": stats}
+
+    @app.post("/mock/reset")
+    async def mock_reset():
+        tokens.clear()
+        sessions.clear()
+        stats.clear()
+        return {"reset": True}
+
+    return app
+
+
+def add_arguments(parser: argparse.ArgumentParser, prefix: str = "") -> None:
+    """Mock configuration flags; ``prefix`` namespaces them when embedded in another CLI"""
+    parser.add_argument(f"--{prefix}latency", default="fixed:50",
+                        help="ask-ai latency until the first byte, e.g. fixed:50, lognormal:400,0.5")
+    parser.add_argument(f"--{prefix}control-latency", default="fixed:5", help="latency of /jwt and /sessions")
+    parser.add_argument(f"--{prefix}response-format", choices=["json", "sse"], default="json")
+    parser.add_argument(f"--{prefix}token-rate", type=float, default=50.0, help="SSE tokens per second")
+    parser.add_argument(f"--{prefix}summary-words", type=int, default=120)
+    parser.add_argument(f"--{prefix}fail", default="", help="ask-ai failure injection, e.g. 401=0.01,429=0.05,500=0.02")
+    parser.add_argument(f"--{prefix}control-fail", default="", help="failure injection for /jwt and /sessions")
+    parser.add_argument(f"--{prefix}retry-after", type=float, default=1.0)
+    parser.add_argument(f"--{prefix}token-ttl", type=int, default=3600)
+    parser.add_argument(f"--{prefix}session-ttl", type=float, default=None)
+    parser.add_argument(f"--{prefix}extraction-answer", default=None,
+                        help='canned drug-extraction answer, e.g. "gentamicin, amoxicillin"')
+    parser.add_argument(f"--{prefix}seed", type=int, default=None)
+
+
+def config_from_args(args: argparse.Namespace, prefix: str = "") -> MockHeidiConfig:
+    """Build a MockHeidiConfig from flags registered by add_arguments"""
+    def get(name: str):
+        return getattr(args, (prefix + name).replace("-", "_"))
+
+    return MockHeidiConfig(
+        latency=Latency(get("latency")),
+        control_latency=Latency(get("control-latency")),
+        response_format=get("response-format"),
+        token_rate=get("token-rate"),
+        summary_words=get("summary-words"),
+        failures=parse_failures(get("fail")),
+        control_failures=parse_failures(get("control-fail")),
+        retry_after=get("retry-after"),
+        token_ttl=get("token-ttl"),
+        session_ttl=get("session-ttl"),
+        extraction_answer=get("extraction-answer"),
+        seed=get("seed"),
+    )
+
+
+def main(argv=None) -> None:
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9000)
+    add_arguments(parser)
+    args = parser.parse_args(argv)
+    uvicorn.run(create_app(config_from_args(args)), host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
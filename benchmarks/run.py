@@ -0,0 +1,293 @@
+"""Benchmark harness for ingestion, search and the /ask-heidi pipeline.
+
+    python -m benchmarks.run --corpus-sizes 5,20 --concurrency 1,4,16 --output results.json
+
+Synthetic guideline PDFs are generated per corpus size into a scratch
+directory; /ask-heidi runs in-process against a local mock Heidi server.
+Results are written as JSON so runs can be compared.
+"""
+import os
+import sys
+import json
+import time
+import socket
+import asyncio
+import logging
+import argparse
+import platform
+import tempfile
+import threading
+import subprocess
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, List
+
+import numpy as np
+
+from .synthetic import generate_corpus, generate_notes, generate_queries
+from . import mock_heidi
+
+logger = logging.getLogger("benchmarks")
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+CONFIG_PREFIXES = ("EMBEDDING_", "VECTOR_", "ASK_HEIDI_", "HEIDI_", "DRUG_EXTRACTION_")
+
+
+def latency_summary(latencies: List[float], elapsed: float, errors: int = 0) -> Dict[str, Any]:
+    """Percentiles (ms) and throughput for one measured run"""
+    values = np.asarray(latencies) * 1000 if latencies else np.zeros(1)
+    return {
+        "requests": len(latencies) + errors,
+        "errors": errors,
+        "elapsed_s": round(elapsed, 3),
+        "qps": round(len(latencies) / elapsed, 2) if elapsed > 0 else 0.0,
+        "mean_ms": round(float(values.mean()), 2),
+        "p50_ms": round(float(np.percentile(values, 50)), 2),
+        "p95_ms": round(float(np.percentile(values, 95)), 2),
+        "p99_ms": round(float(np.percentile(values, 99)), 2),
+        "max_ms": round(float(values.max()), 2),
+    }
+
+
+async def run_load(calls: List[Callable[[], Awaitable[Any]]], concurrency: int) -> Dict[str, Any]:
+    """Run ``calls`` with at most ``concurrency`` in flight; a call that raises counts as an error"""
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies: List[float] = []
+    errors = 0
+
+    async def one(call):
+        nonlocal errors
+        async with semaphore:
+            started = time.perf_counter()
+            try:
+                await call()
+            except Exception as e:
+                errors += 1
+                logger.debug(f"Request failed: {str(e)}")
+                return
+            latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one(call) for call in calls))
+    return latency_summary(latencies, time.perf_counter() - started, errors)
+
+
+def disable_vector_caches(vector_service) -> None:
+    """Measure uncached search: swap in caches that never hold an entry"""
+    from backend.cache import LRUCache
+
+    vector_service.embedding_cache = LRUCache(max_entries=0)
+    vector_service.result_cache = LRUCache(max_entries=0)
+
+
+async def bench_ingest_and_search(args, corpus_dir: Path) -> Dict[str, Any]:
+    """Ingest the corpus in ``corpus_dir`` and measure search at each concurrency level"""
+    from backend.vector_service import VectorService
+
+    service = VectorService()
+    service.use_directories(corpus_dir / "references", corpus_dir / "chroma_db")
+    await service.initialize()
+
+    pdfs = list(service.references_dir.glob("*.pdf"))
+    total_bytes = sum(path.stat().st_size for path in pdfs)
+    try:
+        started = time.perf_counter()
+        result = await service.process_pdfs()
+        ingest_s = time.perf_counter() - started
+
+        # Second pass with nothing changed: the cost paid on every restart
+        started = time.perf_counter()
+        await service.process_pdfs()
+        noop_s = time.perf_counter() - started
+
+        chunks = len(service.lexical_index)
+        pages = len(pdfs) * args.pages_per_pdf
+        report: Dict[str, Any] = {
+            "pdfs": len(pdfs),
+            "pages": pages,
+            "chunks": chunks,
+            "ingest": {
+                "elapsed_s": round(ingest_s, 3),
+                "successful": result.successful,
+                "failed": result.failed,
+                "pages_per_s": round(pages / ingest_s, 2),
+                "chunks_per_s": round(chunks / ingest_s, 2),
+                "mb_per_s": round(total_bytes / 1024 / 1024 / ingest_s, 3),
+                "unchanged_rerun_s": round(noop_s, 3),
+            },
+            "search": [],
+        }
+
+        if not args.cache:
+            disable_vector_caches(service)
+        queries = generate_queries(args.queries, seed=args.seed)
+        # Warm up so the first measured request does not pay one-off costs
+        await service.search(queries[0], n_results=args.n_results)
+        for mode in args.modes:
+            for concurrency in args.concurrency:
+                calls = [
+                    (lambda query=query, mode=mode: service.search(query, n_results=args.n_results, mode=mode))
+                    for query in queries
+                ]
+                stats = await run_load(calls, concurrency)
+                report["search"].append({"mode": mode, "concurrency": concurrency, **stats})
+                logger.info(f"search mode={mode} concurrency={concurrency}: {stats}")
+        return report
+    finally:
+        await service.shutdown()
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_mock_heidi(args):
+    """Run the mock Heidi server on a background thread; returns (server, thread, url)"""
+    import uvicorn
+
+    port = _free_port()
+    config = uvicorn.Config(
+        mock_heidi.create_app(mock_heidi.config_from_args(args, prefix="mock-")),
+        host="127.0.0.1",
+        port=port,
+        log_level="warning"
+    )
+    server = uvicorn.Server(config)
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    while not server.started:
+        time.sleep(0.05)
+    return server, thread, f"http://127.0.0.1:{port}"
+
+
+async def bench_ask_heidi(args, corpus_dir: Path, heidi_url: str) -> List[Dict[str, Any]]:
+    """End-to-end /ask-heidi through the FastAPI app against the mock Heidi server"""
+    import httpx
+
+    os.environ["HEIDI_BASE_URL"] = heidi_url
+    os.environ.setdefault("HEIDI_CACHE_ENABLED", "false")
+    os.environ.setdefault("DRUG_EXTRACTION_MODE", "heidi")
+
+    # The app resolves references/ and chroma_db/ relative to the working directory
+    previous_cwd = os.getcwd()
+    os.chdir(corpus_dir)
+    try:
+        from backend import main
+
+        async with main.app.router.lifespan_context(main.app):
+            transport = httpx.ASGITransport(app=main.app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://benchmark", timeout=None) as client:
+                while (await client.get("/ready")).status_code != 200:
+                    if main.startup_task is not None and main.startup_task.done():
+                        break
+                    await asyncio.sleep(0.2)
+                if not args.cache:
+                    disable_vector_caches(main.vector_service)
+
+                notes = generate_notes(
+                    args.notes,
+                    drugs_per_note=args.drugs_per_note,
+                    padding_sentences=args.note_padding,
+                    seed=args.seed
+                )
+
+                async def post(note: str) -> None:
+                    response = await client.post("/ask-heidi", json={"content": note})
+                    response.raise_for_status()
+
+                results = []
+                for concurrency in args.concurrency:
+                    stats = await run_load([(lambda note=note: post(note)) for note in notes], concurrency)
+                    results.append({"concurrency": concurrency, **stats})
+                    logger.info(f"ask-heidi concurrency={concurrency}: {stats}")
+                return results
+    finally:
+        os.chdir(previous_cwd)
+
+
+def run_metadata(args) -> Dict[str, Any]:
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "HEAD"], cwd=REPO_ROOT, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except Exception:
+        commit = None
+    config = {
+        name: value for name, value in os.environ.items()
+        if name.startswith(CONFIG_PREFIXES) and not any(word in name for word in ("KEY", "SECRET", "PASSWORD", "TOKEN"))
+    }
+    return {
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "git_commit": commit,
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "arguments": {key: value for key, value in vars(args).items() if key != "output"},
+        "config": config,
+    }
+
+
+async def main_async(args) -> Dict[str, Any]:
+    workdir = Path(args.workdir or tempfile.mkdtemp(prefix="heidi-bench-")).resolve()
+    logger.info(f"Benchmark working directory: {workdir}")
+
+    report: Dict[str, Any] = {"meta": run_metadata(args), "corpora": []}
+    mock = None if args.skip_ask_heidi else start_mock_heidi(args)
+    try:
+        for pdf_count in args.corpus_sizes:
+            corpus_dir = workdir / f"corpus_{pdf_count}"
+            generate_corpus(corpus_dir / "references", pdf_count, args.pages_per_pdf, seed=args.seed)
+            logger.info(f"Generated {pdf_count} PDFs x {args.pages_per_pdf} pages in {corpus_dir}")
+
+            corpus_report = await bench_ingest_and_search(args, corpus_dir)
+            if mock is not None:
+                corpus_report["ask_heidi"] = await bench_ask_heidi(args, corpus_dir, mock[2])
+            report["corpora"].append(corpus_report)
+    finally:
+        if mock is not None:
+            server, thread, _ = mock
+            server.should_exit = True
+            thread.join(timeout=10)
+    return report
+
+
+def parse_args(argv=None):
+    def int_list(value: str) -> List[int]:
+        return [int(item) for item in value.split(",") if item]
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--corpus-sizes", type=int_list, default=[5, 20], help="PDF counts to benchmark (comma-separated)")
+    parser.add_argument("--pages-per-pdf", type=int, default=10)
+    parser.add_argument("--queries", type=int, default=200, help="search requests per concurrency level")
+    parser.add_argument("--n-results", type=int, default=5)
+    parser.add_argument("--modes", type=lambda value: value.split(","), default=["vector", "hybrid"],
+                        help="search modes to measure (comma-separated)")
+    parser.add_argument("--concurrency", type=int_list, default=[1, 4, 16], help="concurrency levels (comma-separated)")
+    parser.add_argument("--notes", type=int, default=50, help="/ask-heidi requests per concurrency level")
+    parser.add_argument("--drugs-per-note", type=int, default=2)
+    parser.add_argument("--note-padding", type=int, default=0, help="extra history sentences per note")
+    parser.add_argument("--skip-ask-heidi", action="store_true", help="only benchmark ingestion and search")
+    parser.add_argument("--cache", action="store_true", help="keep the in-process search caches enabled")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--workdir", help="scratch directory (default: a new temporary directory)")
+    parser.add_argument("--output", help="write the JSON report here (default: stdout)")
+    mock_heidi.add_arguments(parser.add_argument_group("mock Heidi server"), prefix="mock-")
+    return parser.parse_args(argv)
+
+
+def main(argv=None) -> None:
+    logging.basicConfig(level=logging.INFO)
+    args = parse_args(argv)
+    report = asyncio.run(main_async(args))
+    text = json.dumps(report, indent=2)
+    if args.output:
+        Path(args.output).write_text(text)
+        logger.info(f"Wrote benchmark report to {args.output}")
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,159 @@
+import random
+import textwrap
+from pathlib import Path
+from typing import List
+
+from backend.drug_extractor import SEED_GENERICS
+
+# Reproducible, guideline-like text: every paragraph names a drug and mixes
+# dosing, indication and safety sentences so both vector and lexical search
+# have something to match.
+INDICATIONS = [
+    "community-acquired pneumonia", "uncomplicated cystitis", "pyelonephritis", "cellulitis",
+    "intra-abdominal infection", "bacterial meningitis", "febrile neutropenia", "sepsis of unknown source",
+    "osteomyelitis", "infective endocarditis", "acute otitis media", "streptococcal pharyngitis",
+    "diabetic foot infection", "hospital-acquired pneumonia", "Clostridioides difficile infection",
+]
+ORGANISMS = [
+    "Staphylococcus aureus", "MRSA", "Streptococcus pneumoniae", "Escherichia coli", "Klebsiella pneumoniae",
+    "Pseudomonas aeruginosa", "Enterococcus faecalis", "Haemophilus influenzae", "anaerobes",
+]
+ROUTES = ["orally", "intravenously", "IV", "IM"]
+FREQUENCIES = ["once daily", "twice daily", "8-hourly", "6-hourly", "12-hourly"]
+SENTENCES = [
+    "{drug} is recommended for {indication} when {organism} is suspected.",
+    "Give {drug} {dose} mg {route} {frequency} for {days} days.",
+    "In renal impairment reduce the dose of {drug} and monitor levels after the third dose.",
+    "{drug} should be avoided in patients with a documented severe allergy.",
+    "Switch from {drug} to an oral agent once the patient is afebrile for 48 hours.",
+    "Therapeutic drug monitoring is required when {drug} is continued beyond {days} days.",
+    "For {indication}, {drug} is an alternative in penicillin allergy.",
+    "Common adverse effects of {drug} include nausea, rash and diarrhoea.",
+    "Check for interactions before starting {drug} in patients on warfarin.",
+    "Paediatric dosing of {drug} is {dose} mg/kg {frequency}, to a maximum adult dose.",
+]
+NOTE_TEMPLATES = [
+    "{age} year old presenting with {indication}. Started on {drugs}. Allergies: {allergy}.",
+    "Patient admitted with {indication}, likely {organism}. Plan: {drugs}; review cultures in 48h.",
+    "Follow-up for {indication}. Currently taking {drugs}. Renal function stable. No known allergies.",
+]
+
+
+def guideline_paragraph(rng: random.Random, drug: str, sentences: int = 6) -> str:
+    """One paragraph of synthetic guideline text about ``drug``"""
+    values = dict(
+        drug=drug.capitalize(),
+        indication=rng.choice(INDICATIONS),
+        organism=rng.choice(ORGANISMS),
+        route=rng.choice(ROUTES),
+        frequency=rng.choice(FREQUENCIES),
+        dose=rng.choice([2, 5, 7.5, 15, 250, 500, 875, 1000, 2000]),
+        days=rng.choice([3, 5, 7, 10, 14]),
+    )
+    return " ".join(rng.choice(SENTENCES).format(**values) for _ in range(sentences))
+
+
+def guideline_pages(rng: random.Random, pages: int, lines_per_page: int = 45,
+                    line_width: int = 90) -> List[List[str]]:
+    """Pages of wrapped guideline text, each a list of lines"""
+    result = []
+    for _ in range(pages):
+        lines: List[str] = []
+        while len(lines) < lines_per_page:
+            drug = rng.choice(SEED_GENERICS)
+            lines.extend(textwrap.wrap(guideline_paragraph(rng, drug), line_width))
+            lines.append("")
+        result.append(lines[:lines_per_page])
+    return result
+
+
+def _escape(text: str) -> str:
+    return text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+
+def write_pdf(path: Path, pages: List[List[str]]) -> None:
+    """Write a minimal text-only PDF (Helvetica, one text object per page)"""
+    objects: List[bytes] = []
+    page_ids = []
+    font_id = 3
+    next_id = 4
+    for lines in pages:
+        stream = "BT /F1 10 Tf 12 TL 50 750 Td\n" + "".join(f"({_escape(line)}) Tj T*\n" for line in lines) + "ET"
+        data = stream.encode("latin-1", "replace")
+        content_id, page_id = next_id, next_id + 1
+        next_id += 2
+        objects.append(b"%d 0 obj\n<< /Length %d >>\nstream\n%s\nendstream\nendobj\n" % (content_id, len(data), data))
+        objects.append((
+            f"{page_id} 0 obj\n<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] "
+            f"/Resources << /Font << /F1 {font_id} 0 R >> >> /Contents {content_id} 0 R >>\nendobj\n"
+        ).encode("latin-1"))
+        page_ids.append(page_id)
+
+    header = [
+        b"1 0 obj\n<< /Type /Catalog /Pages 2 0 R >>\nendobj\n",
+        (f"2 0 obj\n<< /Type /Pages /Kids [{' '.join(f'{p} 0 R' for p in page_ids)}] "
+         f"/Count {len(page_ids)} >>\nendobj\n").encode("latin-1"),
+        b"3 0 obj\n<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>\nendobj\n",
+    ]
+
+    # Objects are numbered 1..n in the order written, so the xref is sequential
+    body = header + sorted(objects, key=lambda obj: int(obj.split(b" ", 1)[0]))
+    output = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for obj in body:
+        offsets.append(len(output))
+        output += obj
+    xref_offset = len(output)
+    output += b"xref\n0 %d\n0000000000 65535 f \n" % (len(body) + 1)
+    for offset in offsets:
+        output += b"%010d 00000 n \n" % offset
+    output += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(body) + 1, xref_offset)
+    Path(path).write_bytes(bytes(output))
+
+
+def generate_corpus(directory: Path, pdfs: int, pages_per_pdf: int, seed: int = 0) -> List[Path]:
+    """Write ``pdfs`` synthetic guideline PDFs into ``directory``"""
+    directory = Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+    rng = random.Random(seed)
+    paths = []
+    for index in range(pdfs):
+        path = directory / f"synthetic_guideline_{index:03d}.pdf"
+        write_pdf(path, guideline_pages(rng, pages_per_pdf))
+        paths.append(path)
+    return paths
+
+
+def generate_notes(count: int, drugs_per_note: int = 2, padding_sentences: int = 0,
+                   seed: int = 0) -> List[str]:
+    """Synthetic clinical notes naming ``drugs_per_note`` antibiotics each.
+
+    ``padding_sentences`` adds unrelated history to grow the note size.
+    """
+    rng = random.Random(seed)
+    notes = []
+    for _ in range(count):
+        drugs = rng.sample(SEED_GENERICS, drugs_per_note)
+        note = rng.choice(NOTE_TEMPLATES).format(
+            age=rng.randint(18, 90),
+            indication=rng.choice(INDICATIONS),
+            organism=rng.choice(ORGANISMS),
+            drugs=" and ".join(drugs),
+            allergy=rng.choice(["nil known", "penicillin (rash)", "sulfonamides"]),
+        )
+        padding = [
+            f"History of {rng.choice(['hypertension', 'type 2 diabetes', 'COPD', 'CKD stage 3'])}, "
+            f"reviewed on day {rng.randint(1, 30)}."
+            for _ in range(padding_sentences)
+        ]
+        notes.append(" ".join([note, *padding]))
+    return notes
+
+
+def generate_queries(count: int, seed: int = 0) -> List[str]:
+    """Search queries in the style /ask-heidi issues"""
+    rng = random.Random(seed)
+    return [
+        f"{rng.choice(SEED_GENERICS)} {rng.choice(['dose', 'renal impairment', 'allergy', 'indication'])}"
+        for _ in range(count)
+    ]
@@ -0,0 +1,41 @@
+"""gunicorn settings for running several workers on one host.
+
+    gunicorn -c gunicorn.conf.py backend.main:app
+
+Before forking, the master ingests once (``python -m backend.ingest``) and
+loads the embedding model; the workers open the index read-only, share the
+model weights copy-on-write and pick up later ingests by polling the
+manifest (VECTOR_RELOAD_INTERVAL). Workers always search the memory-mapped
+matrix index (VECTOR_READ_ENGINE=matrix): it is re-read from disk when the
+corpus changes, whereas a worker's ChromaDB client would keep serving what
+it loaded at startup.
+"""
+import os
+import sys
+import subprocess
+
+
+def _enabled(name: str, default: str = "true") -> bool:
+    return os.getenv(name, default).lower() in ("1", "true", "yes")
+
+
+bind = os.getenv("BIND", "0.0.0.0:8000")
+workers = int(os.getenv("WEB_CONCURRENCY", "2"))
+worker_class = "uvicorn.workers.UvicornWorker"
+timeout = int(os.getenv("GUNICORN_TIMEOUT", "120"))
+preload_app = True
+
+
+def on_starting(server):
+    # Set before ingesting so the master also exports the matrix index
+    os.environ["VECTOR_READ_ENGINE"] = "matrix"
+    # A prebuilt VECTOR_INDEX_ARTIFACT is installed by the workers instead
+    if _enabled("VECTOR_STARTUP_INGEST") and not os.getenv("VECTOR_INDEX_ARTIFACT"):
+        server.log.info("Ingesting references before starting workers")
+        subprocess.run([sys.executable, "-m", "backend.ingest"], check=True)
+    # Workers inherit the environment; none of them writes the index
+    os.environ["VECTOR_READ_ONLY"] = "true"
+
+    if _enabled("EMBEDDING_PRELOAD"):
+        from backend.vector_service import VectorService
+        VectorService().preload_model()